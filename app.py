@@ -1,8 +1,13 @@
 import streamlit as st
 from app.chat_logic import init_session_state, handle_user_message
-from app.rag_pipeline import build_vectorstore_from_uploads
 from app.admin_dashboard import show_admin_dashboard
+from app.embedding_service import warm_up_embedder
+from app.outbox import get_outbox_sender
 from db.database import init_db
+from utils.tracing import serve_metrics
+
+# Heavy ML dependencies (torch, sentence_transformers, faiss, openai) are
+# imported on first use; check with `python -m utils.import_report`.
 
 
 st.set_page_config(
@@ -14,9 +19,13 @@ st.set_page_config(
 
 def main():
     init_db()
+    get_outbox_sender()  # deliver emails left PENDING/RETRYING by a previous run
+    serve_metrics()  # Prometheus /metrics when NEOCONSULT_METRICS_PORT is set
     init_session_state()
 
     mode = st.sidebar.radio("Mode", ["User Chat", "Admin Dashboard"])
+    if mode == "User Chat":
+        warm_up_embedder()
 
     st.sidebar.markdown("### NeoConsult AI Booking Assistant")
     st.sidebar.markdown(
@@ -31,11 +40,21 @@ def main():
     )
 
     if uploaded_files:
+        from app.rag_pipeline import build_vectorstore_from_uploads
+
         with st.spinner("Building knowledge base from PDFs..."):
-            vector_store = build_vectorstore_from_uploads(uploaded_files)
+            unreadable = []
+            vector_store = build_vectorstore_from_uploads(uploaded_files, unreadable)
+            for name in unreadable:
+                st.error(f"Could not read PDF: {name}")
             if vector_store:
                 st.session_state.vector_store = vector_store
                 st.sidebar.success("PDFs processed successfully!")
+                if vector_store.recall_at_k:
+                    k, recall = vector_store.recall_at_k
+                    st.sidebar.caption(
+                        f"Index: {vector_store.index_mode.upper()} (recall@{k} vs exact: {recall:.2%})"
+                    )
             else:
                 st.sidebar.error("No valid text found in the uploaded PDFs.")
 
@@ -47,7 +66,7 @@ def main():
     st.caption("Ask about services or book a project consultation slot.")
 
     # Display chat history
-    for msg in st.session_state.chat_history:
+    for msg in st.session_state.chat_session.chat_history:
         with st.chat_message(msg["role"]):
             st.write(msg["content"])
 
@@ -59,7 +78,10 @@ def main():
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
                 response = handle_user_message(user_input)
+            if isinstance(response, str):
                 st.write(response)
+            else:
+                st.write_stream(response)
 
 
 if __name__ == "__main__":
@@ -1,46 +1,136 @@
 import streamlit as st
-from db.database import SessionLocal, get_all_bookings
+from db.database import SessionLocal, query_bookings
+from utils import tracing
+
+PAGE_SIZE = 50
+TRACES_SHOWN = 20
 
 
 def show_admin_dashboard():
-    """Admin UI to view and filter all bookings."""
+    """Admin UI: bookings table and per-stage latency of traced requests."""
     st.header("NeoConsult Project Bookings – Admin Dashboard")
 
-    db = SessionLocal()
-    bookings = get_all_bookings(db)
+    bookings_tab, performance_tab = st.tabs(["Bookings", "Performance"])
+    with bookings_tab:
+        show_bookings()
+    with performance_tab:
+        show_performance()
+
 
+def show_bookings():
+    """View and filter all bookings, one page at a time."""
     filter_name = st.text_input("Filter by contact name")
     filter_email = st.text_input("Filter by email")
     filter_date = st.date_input("Filter by date", value=None, format="YYYY-MM-DD")
 
-    rows = []
-    for b in bookings:
-        c = b.customer
-        if filter_name and filter_name.lower() not in c.name.lower():
-            continue
-        if filter_email and filter_email.lower() not in c.email.lower():
-            continue
-        if filter_date and b.date != filter_date:
-            continue
-
-        rows.append(
-            {
-                "Booking ID": b.id,
-                "Name": c.name,
-                "Company": c.company,
-                "Email": c.email,
-                "Phone": c.phone,
-                "Project Type": b.booking_type,
-                "Date": b.date,
-                "Time": b.time,
-                "Status": b.status,
-                "Created At": b.created_at,
-            }
+    # Cursor of every page visited so far; reset when the filters change
+    filters = (filter_name, filter_email, filter_date)
+    if st.session_state.get("admin_filters") != filters:
+        st.session_state.admin_filters = filters
+        st.session_state.admin_cursors = [None]
+
+    cursors = st.session_state.admin_cursors
+
+    db = SessionLocal()
+    try:
+        bookings, next_cursor = query_bookings(
+            db,
+            name=filter_name,
+            email=filter_email,
+            date=filter_date,
+            after=cursors[-1],
+            limit=PAGE_SIZE,
         )
+    finally:
+        db.close()
+
+    rows = [
+        {
+            "Booking ID": b.id,
+            "Name": b.name,
+            "Company": b.company,
+            "Email": b.email,
+            "Phone": b.phone,
+            "Project Type": b.booking_type,
+            "Date": b.date,
+            "Time": b.time,
+            "Status": b.status,
+            "Email Status": b.email_status,
+            "Created At": b.created_at,
+        }
+        for b in bookings
+    ]
 
     if rows:
         st.dataframe(rows, use_container_width=True)
     else:
         st.info("No bookings found with the current filters.")
 
-    db.close()
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("Previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    page_col.caption(f"Page {len(cursors)}")
+    if next_col.button("Next", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+
+
+def show_performance():
+    """Latency per traced stage (see utils/tracing.py) since the app started."""
+    if not tracing.is_enabled():
+        st.info("Tracing is off. Start the app with NEOCONSULT_TRACING=1 to record request timings.")
+        return
+
+    stats = tracing.stage_stats()
+    if not stats:
+        st.info("No traced requests yet.")
+        return
+
+    st.dataframe(
+        [
+            {
+                "Stage": name,
+                "Calls": s["count"],
+                "Mean (ms)": round(s["mean_ms"], 1),
+                "p50 (ms)": round(s["p50_ms"], 1),
+                "p95 (ms)": round(s["p95_ms"], 1),
+                "p99 (ms)": round(s["p99_ms"], 1),
+            }
+            for name, s in sorted(stats.items(), key=lambda item: -item[1]["p95_ms"])
+        ],
+        use_container_width=True,
+    )
+
+    stage = st.selectbox("Latency histogram for stage", sorted(stats))
+    st.vega_lite_chart(
+        [{"bucket": label, "count": count} for label, count in tracing.histogram(stage)],
+        {
+            "mark": "bar",
+            "encoding": {
+                # Keep bucket order instead of sorting the labels
+                "x": {"field": "bucket", "type": "ordinal", "sort": None, "title": "Duration"},
+                "y": {"field": "count", "type": "quantitative", "title": "Calls"},
+            },
+        },
+        use_container_width=True,
+    )
+
+    st.subheader("Recent traces")
+    for trace in tracing.recent_traces(TRACES_SHOWN):
+        label = f"{trace['name']} – {trace['duration_ms']:.0f} ms"
+        if trace["error"]:
+            label += f" ({trace['error']})"
+        with st.expander(label):
+            st.dataframe(
+                [
+                    {
+                        "Span": s["name"],
+                        "Duration (ms)": s["duration_ms"],
+                        "Error": s["error"] or "",
+                        "Attributes": ", ".join(f"{k}={v}" for k, v in s["attrs"].items()),
+                    }
+                    for s in trace["spans"]
+                ],
+                use_container_width=True,
+            )
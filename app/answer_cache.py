@@ -0,0 +1,149 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+from .config import (
+    ANSWER_CACHE_BACKEND,
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_PATH,
+)
+from .query_cache import TTLCache, normalize_query
+
+
+def answer_cache_key(model: str, temperature: float, question: str, chunk_ids: Iterable[int]) -> str:
+    """Hash of everything that determines an answer besides the corpus."""
+    chunks_hash = hashlib.sha256(",".join(str(c) for c in chunk_ids).encode("utf-8")).hexdigest()
+    payload = json.dumps([model, temperature, normalize_query(question), chunks_hash])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnswerCache(ABC):
+    """
+    Interface for rag_tool answer caches. Entries are grouped by corpus id.
+    Corpus ids are content addresses (see SimpleVectorStore.corpus_id), so
+    entries never go stale; they leave through TTL/LRU, or invalidate()
+    for manual clean-up.
+    """
+
+    @abstractmethod
+    def get(self, corpus: str, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def put(self, corpus: str, key: str, answer: str):
+        ...
+
+    @abstractmethod
+    def invalidate(self, corpus: Optional[str] = None):
+        """Drop entries for one corpus, or everything when corpus is None."""
+
+
+class NullAnswerCache(AnswerCache):
+    """Cache that never stores anything (ANSWER_CACHE_BACKEND = "none")."""
+
+    def get(self, corpus, key):
+        return None
+
+    def put(self, corpus, key, answer):
+        pass
+
+    def invalidate(self, corpus=None):
+        pass
+
+
+class MemoryAnswerCache(AnswerCache):
+    """Process-local LRU with TTL."""
+
+    def __init__(self, maxsize: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def get(self, corpus, key):
+        return self._cache.get((corpus, key))
+
+    def put(self, corpus, key, answer):
+        self._cache.put((corpus, key), answer)
+
+    def invalidate(self, corpus=None):
+        if corpus is None:
+            self._cache.clear()
+        else:
+            self._cache.pop_matching(lambda k: k[0] == corpus)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class SQLiteAnswerCache(AnswerCache):
+    """SQLite-backed cache, shared by every process using the same file."""
+
+    def __init__(self, path: str = ANSWER_CACHE_PATH, ttl: float = ANSWER_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "corpus TEXT NOT NULL, key TEXT NOT NULL, answer TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, PRIMARY KEY (corpus, key))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_answers_expires_at ON answers (expires_at)"
+            )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, corpus, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer FROM answers WHERE corpus = ? AND key = ? AND expires_at > ?",
+                (corpus, key, time.time()),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, corpus, key, answer):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (corpus, key, answer, expires_at) VALUES (?, ?, ?, ?)",
+                (corpus, key, answer, now + self.ttl),
+            )
+            self._conn.execute("DELETE FROM answers WHERE expires_at <= ?", (now,))
+
+    def invalidate(self, corpus=None):
+        with self._lock, self._conn:
+            if corpus is None:
+                self._conn.execute("DELETE FROM answers")
+            else:
+                self._conn.execute("DELETE FROM answers WHERE corpus = ?", (corpus,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {"size": size, "hits": self.hits, "misses": self.misses}
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Answer cache selected by ANSWER_CACHE_BACKEND, shared by all sessions."""
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            if ANSWER_CACHE_BACKEND == "sqlite":
+                _answer_cache = SQLiteAnswerCache()
+            elif ANSWER_CACHE_BACKEND == "none":
+                _answer_cache = NullAnswerCache()
+            else:
+                _answer_cache = MemoryAnswerCache()
+        return _answer_cache
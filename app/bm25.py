@@ -0,0 +1,115 @@
+import os
+import re
+import zlib
+from typing import Iterable, List, Sequence, Tuple
+import numpy as np
+from .config import BM25_K1, BM25_B, RRF_K
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> np.ndarray:
+    """Term ids (crc32 of the lowercased token) of every token in `text`, in order."""
+    return np.fromiter(
+        (zlib.crc32(t.lower().encode("utf-8")) for t in _TOKEN.findall(text)),
+        dtype=np.uint32,
+    )
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk positions, stored as CSR postings:
+    for vocab[i], postings[indptr[i]:indptr[i + 1]] are the positions of
+    the chunks containing it and tfs the matching term frequencies.
+    """
+
+    FILES = ("vocab", "indptr", "postings", "tfs", "lengths")
+
+    def __init__(self, vocab: np.ndarray, indptr: np.ndarray, postings: np.ndarray, tfs: np.ndarray, lengths: np.ndarray):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.postings = postings
+        self.tfs = tfs
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def build(cls, texts: Iterable[str]) -> "BM25Index":
+        terms, positions, lengths = [], [], []
+        for pos, text in enumerate(texts):
+            ids = tokenize(text)
+            terms.append(ids)
+            positions.append(np.full(len(ids), pos, dtype=np.uint64))
+            lengths.append(len(ids))
+        if not terms or not sum(lengths):
+            empty = np.zeros(0, dtype=np.uint32)
+            return cls(empty, np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32),
+                       np.zeros(0, dtype=np.uint16), np.array(lengths, dtype=np.float32))
+        # One sort over (term, position) keys gives postings grouped by term
+        keys = (np.concatenate(terms).astype(np.uint64) << np.uint64(32)) | np.concatenate(positions)
+        keys, tfs = np.unique(keys, return_counts=True)
+        term_of = (keys >> np.uint64(32)).astype(np.uint32)
+        vocab, starts = np.unique(term_of, return_index=True)
+        indptr = np.append(starts, len(keys)).astype(np.int64)
+        postings = (keys & np.uint64(0xFFFFFFFF)).astype(np.int32)
+        return cls(vocab, indptr, postings, np.minimum(tfs, 65535).astype(np.uint16),
+                   np.array(lengths, dtype=np.float32))
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.FILES)
+
+    def search(self, query: str, k: int, k1: float = BM25_K1, b: float = BM25_B) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (positions, scores) by BM25, best first; only chunks sharing a term."""
+        q = np.unique(tokenize(query))
+        slots = np.searchsorted(self.vocab, q)
+        found = slots < len(self.vocab)
+        slots = slots[found]
+        slots = slots[self.vocab[slots] == q[found]]
+        if not len(slots) or not len(self):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        n = len(self)
+        posts, contribs = [], []
+        for slot in slots:
+            lo, hi = self.indptr[slot], self.indptr[slot + 1]
+            post = self.postings[lo:hi]
+            tf = self.tfs[lo:hi].astype(np.float32)
+            df = hi - lo
+            idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            norm = k1 * (1.0 - b + b * self.lengths[post] / self.avg_length)
+            posts.append(post)
+            contribs.append(idf * tf * (k1 + 1.0) / (tf + norm))
+        uniq, inverse = np.unique(np.concatenate(posts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contribs))
+        top = np.argsort(-scores, kind="stable")[:k] if len(scores) <= k else np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return uniq[top].astype(np.int64), scores[top].astype(np.float32)
+
+    def save(self, path: str):
+        for name in self.FILES:
+            np.save(os.path.join(path, f"bm25_{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load an index written by `save`; postings are memory-mapped."""
+        arrays = {
+            name: np.load(os.path.join(path, f"bm25_{name}.npy"), mmap_mode="r" if name in ("postings", "tfs") else None)
+            for name in cls.FILES
+        }
+        return cls(**arrays)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int, rrf_k: int = RRF_K) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked id lists: score(id) = sum over lists of 1 / (rrf_k + rank).
+    Returns the top-k (id, score) pairs, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(scores.items(), key=lambda kv: -kv[1])[:k]
@@ -1,10 +1,18 @@
 from dataclasses import dataclass, field
-from typing import Optional, Dict
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Dict, List, Tuple
 from utils.validators import (
     is_valid_email,
     parse_booking_date,
     parse_booking_time,
 )
+from .config import (
+    SLOT_CAPACITY,
+    SLOT_DAY_START_HOUR,
+    SLOT_DAY_END_HOUR,
+    SLOT_MINUTES,
+    SLOT_SUGGESTIONS,
+)
 
 BOOKING_FIELDS = ["name", "company", "email", "phone", "booking_type", "date", "time"]
 
@@ -94,3 +102,67 @@ def summarize_booking(state: BookingState) -> str:
         f"- Preferred Time: {state.time}\n\n"
         "Reply 'yes' to confirm or 'no' to cancel."
     )
+
+
+def slot_times() -> List[time]:
+    """Bookable start times of a day, from SLOT_DAY_START_HOUR to SLOT_DAY_END_HOUR."""
+    start = datetime.combine(date.min, time(SLOT_DAY_START_HOUR))
+    end = datetime.combine(date.min, time(SLOT_DAY_END_HOUR))
+    times = []
+    while start < end:
+        times.append(start.time())
+        start += timedelta(minutes=SLOT_MINUTES)
+    return times
+
+
+def is_slot_time(time_obj: time) -> bool:
+    """True when time_obj is the start of a bookable slot (see slot_times)."""
+    return time_obj in slot_times()
+
+
+def slot_rules() -> str:
+    """How slots are laid out, for replies to off-grid times."""
+    times = slot_times()
+    return (
+        f"Consultations start every {SLOT_MINUTES} minutes, "
+        f"from {times[0]:%H:%M} to {times[-1]:%H:%M} (e.g. {times[0]:%H:%M} or {times[1]:%H:%M})."
+    )
+
+
+def suggest_free_slots(
+    free_places: Dict[Tuple[date, time], int],
+    date_obj: date,
+    time_obj: time,
+    days: int,
+    limit: int = SLOT_SUGGESTIONS,
+    now: Optional[datetime] = None,
+) -> List[Tuple[date, time]]:
+    """
+    Nearest free slots to the requested one: same day first (closest time
+    first), then following days in order. `free_places` maps (date, time)
+    to free places as returned by db.database.get_slot_usage; slots not
+    in it are empty. Slots that start before `now` are never offered.
+    """
+    now = now or datetime.now()
+    requested = datetime.combine(date_obj, time_obj)
+    suggestions = []
+    for offset in range(days):
+        day = date_obj + timedelta(days=offset)
+        if day < now.date():
+            continue
+        times = [t for t in slot_times() if datetime.combine(day, t) > now]
+        if offset == 0:
+            times.sort(key=lambda t: abs(datetime.combine(day, t) - requested))
+        for t in times:
+            if (day, t) != (date_obj, time_obj) and free_places.get((day, t), SLOT_CAPACITY) > 0:
+                suggestions.append((day, t))
+                if len(suggestions) == limit:
+                    return suggestions
+    return suggestions
+
+
+def format_slot_suggestions(suggestions: List[Tuple[date, time]]) -> str:
+    if not suggestions:
+        return "I couldn't find a free slot in the coming days."
+    lines = [f"- {d:%Y-%m-%d} at {t:%H:%M}" for d, t in suggestions]
+    return "Nearest free slots:\n" + "\n".join(lines)
@@ -0,0 +1,236 @@
+import json
+import os
+import re
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from .config import CHUNK_SIZE, CHUNK_OVERLAP
+from .sentence_index import SentenceIndex
+
+# Chunk spans within one document: page number (0-based) and byte offsets
+SPAN_DTYPE = np.dtype([("page", np.int32), ("start", np.int64), ("end", np.int64)])
+# Chunk rows of a store: SPAN_DTYPE plus the position of the document
+CHUNK_DTYPE = np.dtype([("doc", np.int32), ("page", np.int32), ("start", np.int64), ("end", np.int64)])
+
+_WORD = re.compile(rb"\S+")
+_SENTENCE_END = re.compile(rb"[.!?][\"')\]]*(?=\s|$)")
+
+
+def chunk_spans(data: bytes, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[Tuple[int, int]]:
+    """
+    Split UTF-8 text into overlapping windows of at most `chunk_size` words
+    and return their (start, end) byte offsets.
+
+    A window ends at the last sentence end in its second half when there
+    is one, and the next window starts at the first sentence start inside
+    the `overlap` words before that. Offsets always fall on ASCII
+    whitespace, so every span decodes on its own.
+    """
+    bounds = np.array([m.span() for m in _WORD.finditer(data)], dtype=np.int64).reshape(-1, 2)
+    n = len(bounds)
+    if not n:
+        return []
+    sentence_ends = np.fromiter((m.end() for m in _SENTENCE_END.finditer(data)), dtype=np.int64)
+    breaks = np.isin(bounds[:, 1], sentence_ends)  # a sentence ends after word i
+
+    spans = []
+    start = prev_end = 0
+    half = max(chunk_size // 2, 1)
+    while start < n:
+        end = min(start + chunk_size, n)
+        if end < n:
+            # Only cut where the window still advances past the previous one
+            lo = max(start + half, prev_end)
+            cut = np.flatnonzero(breaks[lo:end])
+            if len(cut):
+                end = lo + int(cut[-1]) + 1
+        spans.append((int(bounds[start, 0]), int(bounds[end - 1, 1])))
+        if end >= n:
+            break
+        prev_end = end
+        nxt = max(end - overlap, start + 1)
+        lead = np.flatnonzero(breaks[nxt - 1:end - 1])
+        if len(lead):
+            nxt += int(lead[0])
+        start = nxt
+    return spans
+
+
+def chunk_pages(pages: Iterable[str], chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> "ChunkedDocument":
+    """Chunk a document page by page; chunks never cross a page boundary."""
+    parts = []
+    rows = []
+    offset = 0
+    for page_no, page in enumerate(pages):
+        data = page.encode("utf-8") + b"\n"
+        rows.extend((page_no, offset + s, offset + e) for s, e in chunk_spans(data, chunk_size, overlap))
+        parts.append(data)
+        offset += len(data)
+    return ChunkedDocument(b"".join(parts), np.array(rows, dtype=SPAN_DTYPE), SentenceIndex.build(parts))
+
+
+class ChunkedDocument:
+    """
+    One document's text (UTF-8, pages joined by newlines), the spans of
+    its chunks and its sentence index. Overlapping chunks share the text
+    instead of copying it.
+    """
+
+    def __init__(self, text: bytes, spans: np.ndarray, sentences: SentenceIndex):
+        self.text = text
+        self.spans = spans
+        self.sentences = sentences
+
+    @classmethod
+    def from_chunks(cls, chunks: List[str]) -> "ChunkedDocument":
+        """Wrap already split chunk texts (page numbers unknown, stored as -1)."""
+        parts = []
+        rows = []
+        offset = 0
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            rows.append((-1, offset, offset + len(data)))
+            parts.append(data + b"\n")
+            offset += len(data) + 1
+        return cls(b"".join(parts), np.array(rows, dtype=SPAN_DTYPE), SentenceIndex.build(parts))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.text) + self.spans.nbytes + self.sentences.nbytes
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __getitem__(self, i: int) -> str:
+        row = self.spans[i]
+        return self.text[row["start"]:row["end"]].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class ChunkTable:
+    """
+    Chunk texts of a vector store as views into per-document buffers.
+
+    `meta` holds one CHUNK_DTYPE row (doc, page, start, end) per chunk;
+    `documents`, `buffers` and `sentences` are indexed by meta["doc"].
+    Indexing the table returns chunk text, so it can stand in for a list
+    of strings. Buffers are bytes in memory or slices of one
+    memory-mapped blob after `load`.
+    """
+
+    def __init__(
+        self,
+        documents: Optional[List[str]] = None,
+        buffers: Optional[list] = None,
+        meta: Optional[np.ndarray] = None,
+        sentences: Optional[List[SentenceIndex]] = None,
+    ):
+        self.documents = documents or []
+        self.buffers = buffers or []
+        self.meta = meta if meta is not None else np.zeros(0, dtype=CHUNK_DTYPE)
+        self.sentences = sentences or []
+
+    def __len__(self):
+        return len(self.meta)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        row = self.meta[i]
+        return bytes(self.buffers[row["doc"]][row["start"]:row["end"]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def doc_id(self, pos: int) -> str:
+        return self.documents[self.meta["doc"][pos]]
+
+    def page(self, pos: int) -> Optional[int]:
+        """1-based source page of a chunk, or None when unknown."""
+        page = int(self.meta["page"][pos])
+        return page + 1 if page >= 0 else None
+
+    def sentence_parts(self, positions: Iterable[int]) -> list:
+        """(sentence index, buffer, start, end) of chunks, for sentence_index.top_sentences."""
+        parts = []
+        for pos in positions:
+            row = self.meta[pos]
+            doc = int(row["doc"])
+            parts.append((self.sentences[doc], self.buffers[doc], int(row["start"]), int(row["end"])))
+        return parts
+
+    def doc_mask(self, doc_id: str) -> np.ndarray:
+        if doc_id not in self.documents:
+            return np.zeros(len(self.meta), dtype=bool)
+        return self.meta["doc"] == self.documents.index(doc_id)
+
+    def append(self, doc_id: str, document: ChunkedDocument):
+        rows = np.empty(len(document), dtype=CHUNK_DTYPE)
+        rows["doc"] = len(self.documents)
+        for field in SPAN_DTYPE.names:
+            rows[field] = document.spans[field]
+        self.documents.append(doc_id)
+        self.buffers.append(document.text)
+        self.sentences.append(document.sentences)
+        self.meta = np.concatenate([self.meta, rows])
+
+    def take(self, keep: np.ndarray) -> "ChunkTable":
+        """Table of the chunks at positions `keep`; unreferenced documents are dropped."""
+        meta = self.meta[keep]
+        used = np.unique(meta["doc"])
+        remap = np.full(len(self.documents), -1, dtype=np.int32)
+        remap[used] = np.arange(len(used), dtype=np.int32)
+        meta["doc"] = remap[meta["doc"]]
+        return ChunkTable(
+            [self.documents[i] for i in used],
+            [self.buffers[i] for i in used],
+            meta,
+            [self.sentences[i] for i in used],
+        )
+
+    def save(self, path: str):
+        """
+        Write text.bin (all buffers), text_offsets.npy, chunks.npy,
+        documents.json and the merged sentence index (sentences_*.npy).
+        """
+        offsets = np.zeros(len(self.buffers) + 1, dtype=np.int64)
+        with open(os.path.join(path, "text.bin"), "wb") as fh:
+            for i, buf in enumerate(self.buffers):
+                data = bytes(buf)
+                fh.write(data)
+                offsets[i + 1] = offsets[i] + len(data)
+        np.save(os.path.join(path, "text_offsets.npy"), offsets)
+        np.save(os.path.join(path, "chunks.npy"), self.meta)
+        with open(os.path.join(path, "documents.json"), "w") as fh:
+            json.dump(self.documents, fh)
+        merged, doc_offsets = SentenceIndex.concat(self.sentences)
+        np.save(os.path.join(path, "sentences_docs.npy"), doc_offsets)
+        np.save(os.path.join(path, "sentences_spans.npy"), merged.spans)
+        np.save(os.path.join(path, "sentences_term_offsets.npy"), merged.term_offsets)
+        np.save(os.path.join(path, "sentences_terms.npy"), merged.terms)
+        np.save(os.path.join(path, "sentences_bullets.npy"), merged.bullets)
+
+    @classmethod
+    def load(cls, path: str) -> "ChunkTable":
+        """Load a table written by `save`, memory-mapping the text blob."""
+        blob_path = os.path.join(path, "text.bin")
+        if os.path.getsize(blob_path) > 0:
+            blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            blob = np.zeros(0, dtype=np.uint8)
+        offsets = np.load(os.path.join(path, "text_offsets.npy"))
+        with open(os.path.join(path, "documents.json")) as fh:
+            documents = json.load(fh)
+        buffers = [blob[offsets[i]:offsets[i + 1]] for i in range(len(documents))]
+        merged = SentenceIndex(
+            np.load(os.path.join(path, "sentences_spans.npy")),
+            np.load(os.path.join(path, "sentences_term_offsets.npy")),
+            np.load(os.path.join(path, "sentences_terms.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "sentences_bullets.npy")),
+        )
+        doc_offsets = np.load(os.path.join(path, "sentences_docs.npy"))
+        sentences = [merged.slice(doc_offsets[i], doc_offsets[i + 1]) for i in range(len(documents))]
+        return cls(documents, buffers, np.load(os.path.join(path, "chunks.npy")), sentences)
@@ -3,10 +3,97 @@
 RAG_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 EMBED_DIM = 384
 
+# Word-window chunking used when building the knowledge base
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+
+# Vector index type (see make_index in app/rag_pipeline.py)
+VECTOR_INDEX_MODE = "auto"  # "auto", "flat", "ivf" or "hnsw"
+VECTOR_INDEX_PQ = False  # product-quantize stored vectors in IVF/HNSW indexes
+ANN_MIN_VECTORS = 20000  # "auto" keeps the exact flat index below this size
+IVF_MIN_VECTORS = 1000000  # "auto" prefers IVF over HNSW above this size
+IVF_NPROBE = 16
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+PQ_M = 48  # PQ sub-quantizers, must divide EMBED_DIM
+RECALL_K = 10
+RECALL_SAMPLE_QUERIES = 200
+RECALL_SCAN_ROWS = 65536  # stored vectors compared per block when measuring recall
+
+# Lexical retrieval (see app/bm25.py)
+RETRIEVAL_MODE = "hybrid"  # "dense" (FAISS), "sparse" (BM25) or "hybrid" (rank fusion)
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # reciprocal rank fusion damping constant
+HYBRID_CANDIDATES = 30  # hits taken from each ranking before fusion
+
+# Query caches used by similarity_search (see app/query_cache.py)
+QUERY_CACHE_SIZE = 2048  # normalized query -> embedding, shared by all sessions
+QUERY_CACHE_TTL = 6 * 3600  # seconds
+RESULT_CACHE_SIZE = 1024  # (corpus version, query, k, mode) -> top-k ids, per store
+
+# Shared embedding service for query encoding (see app/embedding_service.py)
+EMBED_SERVICE_MAX_BATCH = 64  # texts per forward pass
+EMBED_SERVICE_MAX_WAIT_MS = 5  # how long the first request waits for company
+
+# PDF ingestion pipeline (see app/ingest.py)
+INGEST_WORKERS = 0  # extraction processes; 0 = one per CPU core
+INGEST_PAGES_PER_TASK = 8  # pages extracted per worker task
+EMBED_BATCH_SIZE = 64  # chunks sent to the embedder at once
+
+# Knowledge-base cache shared by all sessions (see app/kb_cache.py)
+KB_CACHE_MAX_BYTES = 512 * 1024 * 1024  # per-file chunks + embeddings
+KB_CACHE_MAX_STORES = 32  # assembled vector stores, one per distinct file set
+
+# On-disk vector stores, shared by all worker processes on this host
+VECTOR_STORE_DIR = ".kb_store"
+
+# LLM used by rag_tool
+LLM_MODEL = "gpt-4o-mini"
+LLM_TEMPERATURE = 0.2
+RAG_TOP_K = 6  # candidates retrieved; the context builder keeps what fits
+STREAM_RESPONSES = True  # render rag_tool answers token by token
+
+# Prompt assembly for rag_tool (see app/context_builder.py). Tokens are
+# counted with tiktoken; without it they are estimated as ~4 characters each
+PROMPT_TOKEN_BUDGET = 2500  # retrieved context + chat history + question
+HISTORY_TOKEN_BUDGET = 500  # share of the budget chat history may use
+HISTORY_SUMMARY_WORDS = 25  # older messages are cut to this many words
+NEAR_DUP_THRESHOLD = 0.8  # word 5-gram Jaccard above which chunks are duplicates
+
+# Answer cache for rag_tool (see app/answer_cache.py)
+ANSWER_CACHE_BACKEND = "memory"  # "memory", "sqlite" or "none"
+ANSWER_CACHE_SIZE = 1024  # entries kept by the memory backend
+ANSWER_CACHE_TTL = 24 * 3600  # seconds
+ANSWER_CACHE_PATH = "answer_cache.db"  # used by the sqlite backend
+
+# Outbound email queue (see app/outbox.py)
+OUTBOX_BATCH_SIZE = 20  # emails claimed per sender pass
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BACKOFF_SECONDS = 30  # doubled after every failed attempt
+OUTBOX_MAX_BACKOFF_SECONDS = 3600
+OUTBOX_POLL_SECONDS = 10  # idle wake-up to pick up retries
+OUTBOX_LEASE_SECONDS = 300  # claimed emails become due again after this
+SMTP_IDLE_SECONDS = 60  # close the pooled SMTP connection after this idle time
+
+# Consultation slots (see app/booking_flow.py)
+SLOT_CAPACITY = 1  # consultations per date/time
+SLOT_DAY_START_HOUR = 9
+SLOT_DAY_END_HOUR = 18
+SLOT_MINUTES = 30
+SLOT_SUGGESTIONS = 3  # free slots offered when the requested one is full
+SLOT_SEARCH_DAYS = 14  # how far ahead suggestions may go
+
+# HTTP/WebSocket front end for the chat engine (see app/server.py)
+ENGINE_WORKERS = 32  # threads running blocking chat turns
+SESSION_TTL_SECONDS = 3600  # idle sessions are dropped after this
+MAX_REQUEST_BYTES = 64 * 1024  # largest HTTP body or WebSocket message accepted
+
 CHAT_MEMORY_LIMIT = 25  # last 20–25 messages for short-term memory
 
 SYSTEM_PROMPT = (
     "You are NeoConsult — an AI Project Booking Assistant for an analytics company. "
     "You answer questions about services using given context and help users book "
-    "project consultation slots. Be concise, professional, and clear."
+    "project consultation slots. Be concise, professional, and clear. "
+    "Context passages are labelled with their source page; cite it when useful."
 )
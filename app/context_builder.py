@@ -0,0 +1,205 @@
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+from .config import (
+    LLM_MODEL,
+    RAG_TOP_K,
+    CHAT_MEMORY_LIMIT,
+    CHUNK_OVERLAP,
+    PROMPT_TOKEN_BUDGET,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_SUMMARY_WORDS,
+    NEAR_DUP_THRESHOLD,
+)
+
+logger = logging.getLogger(__name__)
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """tiktoken encoder for LLM_MODEL, or False when tiktoken is not installed."""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                try:
+                    import tiktoken
+
+                    try:
+                        _encoder = tiktoken.encoding_for_model(LLM_MODEL)
+                    except KeyError:
+                        _encoder = tiktoken.get_encoding("o200k_base")
+                except ImportError:
+                    logger.warning("tiktoken is not installed; estimating prompt tokens as ~4 characters each")
+                    _encoder = False
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Exact count with tiktoken, else the usual ~4 characters per token estimate."""
+    encoder = _get_encoder()
+    if encoder:
+        return len(encoder.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+@dataclass
+class ContextReport:
+    """Token accounting for one prompt, before and after budgeting."""
+    tokens_before: int
+    tokens_after: int
+    chunks_in: int
+    chunks_used: int
+    duplicates_removed: int
+    history_in: int
+    history_verbatim: int
+    history_summarized: int
+
+
+def _shingles(words: List[str], n: int = 5) -> set:
+    if len(words) < n:
+        return {tuple(words)}
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+# Shorter shared edges are more likely a coincidence than a window overlap
+MIN_SHARED_WORDS = 3
+
+
+def _shared_edge(first: List[str], second: List[str], limit: int) -> int:
+    """Length of the longest suffix of `first` (at most `limit` words) that starts `second`."""
+    for n in range(min(limit, len(first), len(second)), MIN_SHARED_WORDS - 1, -1):
+        if first[-n:] == second[:n]:
+            return n
+    return 0
+
+
+def _drop_overlap(words: List[str], kept: List[List[str]], overlap: int) -> List[str]:
+    """
+    Strip a leading/trailing window overlap shared with an already kept
+    chunk. chunk_spans starts windows at a sentence inside the last
+    `overlap` words, so the shared part is up to `overlap` words long.
+    """
+    if overlap <= 0:
+        return words
+    for other in kept:
+        n = _shared_edge(other, words, overlap)
+        if 0 < n < len(words):
+            words = words[n:]
+        n = _shared_edge(words, other, overlap)
+        if 0 < n < len(words):
+            words = words[:-n]
+    return words
+
+
+def select_chunks(
+    hits: List[Tuple[int, str, float]],
+    budget: int,
+    overlap: int = CHUNK_OVERLAP,
+    threshold: float = NEAR_DUP_THRESHOLD,
+) -> Tuple[List[Tuple[int, str]], int]:
+    """
+    Pick retrieved (chunk_id, chunk, distance) hits for the prompt:
+    drop near-duplicates (word 5-gram Jaccard >= threshold), strip the
+    overlap shared by neighbouring windows, then fill `budget` tokens
+    greedily by relevance per token. The result keeps relevance order.
+    Returns ([(chunk_id, text)], duplicates_removed).
+    """
+    kept_words: List[List[str]] = []
+    kept_shingles: List[set] = []
+    candidates = []
+    duplicates = 0
+    for rank, (cid, chunk, dist) in enumerate(hits):
+        words = chunk.split()
+        sh = _shingles(words)
+        if any(len(sh & other) / len(sh | other) >= threshold for other in kept_shingles):
+            duplicates += 1
+            continue
+        trimmed = _drop_overlap(words, kept_words, overlap)
+        kept_words.append(words)
+        kept_shingles.append(sh)
+        text = " ".join(trimmed)
+        tokens = count_tokens(text)
+        relevance = 1.0 / (1.0 + max(dist, 0.0))
+        candidates.append((relevance / max(tokens, 1), rank, cid, text, tokens))
+
+    chosen = []
+    used = 0
+    for _, rank, cid, text, tokens in sorted(candidates, key=lambda c: -c[0]):
+        if used + tokens <= budget:
+            chosen.append((rank, cid, text))
+            used += tokens
+    chosen.sort()
+    return [(cid, text) for _, cid, text in chosen], duplicates
+
+
+def build_history(chat_history: List[Dict], budget: int = HISTORY_TOKEN_BUDGET) -> Tuple[str, int, int]:
+    """
+    Render chat history within `budget` tokens: newest messages verbatim,
+    older ones shortened to their first HISTORY_SUMMARY_WORDS words, the
+    oldest dropped. Returns (text, verbatim count, summarized count).
+    """
+    lines: List[str] = []
+    used = 0
+    verbatim = summarized = 0
+    shortening = False
+    for m in reversed(chat_history):
+        line = f"{m['role']}: {m['content']}"
+        tokens = count_tokens(line) + 1
+        if not shortening and used + tokens <= budget:
+            verbatim += 1
+        else:
+            shortening = True
+            words = m["content"].split()
+            short = " ".join(words[:HISTORY_SUMMARY_WORDS])
+            line = f"{m['role']} (earlier): {short}{' …' if len(words) > HISTORY_SUMMARY_WORDS else ''}"
+            tokens = count_tokens(line) + 1
+            if used + tokens > budget:
+                break
+            summarized += 1
+        lines.append(line)
+        used += tokens
+    return "\n".join(reversed(lines)), verbatim, summarized
+
+
+def build_context(
+    query: str,
+    hits: List[Tuple[int, str, float]],
+    chat_history: List[Dict],
+    budget: int = PROMPT_TOKEN_BUDGET,
+    baseline_k: int = RAG_TOP_K,
+    baseline_history: int = CHAT_MEMORY_LIMIT,
+) -> Tuple[List[Tuple[int, str]], str, ContextReport]:
+    """
+    Assemble the retrieved context and chat history for a rag_tool prompt
+    within `budget` tokens. History gets up to HISTORY_TOKEN_BUDGET and the
+    rest goes to chunks. The report compares against the unbudgeted prompt
+    (top `baseline_k` chunks plus the last `baseline_history` messages).
+    """
+    history_text, verbatim, summarized = build_history(chat_history, min(HISTORY_TOKEN_BUDGET, budget))
+    chunk_budget = max(budget - count_tokens(history_text) - count_tokens(query), 0)
+    chunks, duplicates = select_chunks(hits, chunk_budget)
+
+    naive = "\n\n".join(c for _, c, _ in hits[:baseline_k]) + "\n".join(
+        f"{m['role']}: {m['content']}" for m in chat_history[-baseline_history:]
+    )
+    report = ContextReport(
+        tokens_before=count_tokens(naive) + count_tokens(query),
+        tokens_after=sum(count_tokens(t) for _, t in chunks) + count_tokens(history_text) + count_tokens(query),
+        chunks_in=len(hits),
+        chunks_used=len(chunks),
+        duplicates_removed=duplicates,
+        history_in=len(chat_history),
+        history_verbatim=verbatim,
+        history_summarized=summarized,
+    )
+    logger.info(
+        "prompt tokens %d -> %d (chunks %d/%d, %d near-duplicates, history %d verbatim + %d summarized of %d)",
+        report.tokens_before, report.tokens_after, report.chunks_used, report.chunks_in,
+        report.duplicates_removed, report.history_verbatim, report.history_summarized, report.history_in,
+    )
+    return chunks, history_text, report
@@ -0,0 +1,136 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+from .config import RAG_EMBED_MODEL, EMBED_SERVICE_MAX_BATCH, EMBED_SERVICE_MAX_WAIT_MS
+
+_embedder = None
+_embedder_lock = threading.Lock()
+_service = None
+_warmup_thread = None
+
+
+def load_embedder():
+    """
+    Load the sentence-transformer model once per process. torch and
+    sentence_transformers are only imported here, on first use.
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                from sentence_transformers import SentenceTransformer
+
+                _embedder = SentenceTransformer(RAG_EMBED_MODEL)
+    return _embedder
+
+
+def warm_up_embedder() -> threading.Thread:
+    """Load the embedder in a background thread so the first upload doesn't wait."""
+    global _warmup_thread
+    with _embedder_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=load_embedder, name="embedder-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+class EmbeddingService:
+    """
+    Micro-batching front end for a sentence-transformer model.
+
+    Callers from any session thread submit texts; a single background
+    worker collects whatever requests arrive within `max_wait_ms` of the
+    first one (up to `max_batch` texts), runs one forward pass and
+    resolves each caller's future with its rows.
+    """
+
+    def __init__(self, model, max_batch: int = EMBED_SERVICE_MAX_BATCH, max_wait_ms: float = EMBED_SERVICE_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for encoding; the future resolves to a float32 matrix."""
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, texts: List[str], timeout: float = None):
+        """Blocking helper around submit()."""
+        return self.submit(texts).result(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "rows": self.rows,
+            "avg_batch_rows": self.rows / self.batches if self.batches else 0.0,
+        }
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        import numpy as np
+
+        while True:
+            batch = [(t, f) for t, f in self._collect() if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            texts = [text for t, _ in batch for text in t]
+            try:
+                emb = self.model.encode(texts, batch_size=len(texts), show_progress_bar=False)
+                emb = np.asarray(emb, dtype="float32")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            self.rows += len(texts)
+            start = 0
+            for t, future in batch:
+                # Copy: a view would keep the whole batch matrix alive in caches
+                future.set_result(emb[start:start + len(t)].copy())
+                start += len(t)
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Micro-batching embedding service shared by all sessions."""
+    global _service
+    if _service is None:
+        model = load_embedder()
+        with _embedder_lock:
+            if _service is None:
+                _service = EmbeddingService(model)
+    return _service
@@ -0,0 +1,233 @@
+"""
+Chat engine independent of the UI framework.
+
+    engine = ChatEngine(vector_store=store, llm_client=client, mailer=sender)
+    session = engine.new_session()
+    reply = engine.handle(session, "What services do you offer?")
+
+All per-user state lives in a ChatSession, a plain dataclass that
+round-trips through to_dict()/from_dict(), so sessions can be kept in
+st.session_state (app/chat_logic.py), in memory behind the asyncio server
+(app/server.py) or in any external store. Nothing here imports Streamlit.
+Dependencies are passed in:
+
+- vector_store: default knowledge base (handle() can override per call)
+- llm_client: OpenAI-compatible client; None uses tools.get_llm_client()
+- db_scope: context manager factory yielding a SQLAlchemy session
+- mailer: outbox sender woken after a booking; None uses get_outbox_sender()
+- answer_cache: AnswerCache for RAG answers; None uses get_answer_cache()
+
+One engine is shared by all sessions. handle() blocks (retrieval, LLM,
+SQLite); turns of different sessions may run on different threads, turns
+of one session must not overlap.
+"""
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Union
+
+from db.session import session_scope
+from utils.tracing import span
+from utils.validators import is_valid_email, parse_booking_date, parse_booking_time
+from .booking_flow import BOOKING_FIELDS, format_slot_suggestions, is_slot_time, slot_rules
+from .config import STREAM_RESPONSES
+from .tools import booking_persistence_tool, rag_tool, slot_availability_tool
+
+# Question asked after each booking field is collected
+NEXT_QUESTION = {
+    "name": "Thanks, may I have your company name?",
+    "company": "Please share your email address for confirmation.",
+    "email": "Got it! Please enter your phone number.",
+    "phone": "What type of project consultation would you like to book?",
+    "booking_type": "Please provide the preferred date (YYYY-MM-DD).",
+    "date": "And what time works best for you? (HH:MM 24-hour format)",
+}
+
+
+@dataclass
+class ChatSession:
+    """Serializable state of one conversation."""
+
+    session_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    chat_history: List[Dict[str, str]] = field(default_factory=list)
+    mode: str = "chat"  # "chat" or "booking"
+    booking: Dict[str, str] = field(default_factory=dict)  # BOOKING_FIELDS collected so far
+    booking_key: Optional[str] = None  # idempotency key of the summary being confirmed
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChatSession":
+        return cls(**data)
+
+    def reset_booking(self):
+        self.mode = "chat"
+        self.booking.clear()
+        self.booking_key = None
+
+
+def _record_streamed_answer(user_message, pieces, chat_history):
+    """Pass streamed pieces through and store the full answer once done."""
+    parts = []
+    for piece in pieces:
+        parts.append(piece)
+        yield piece
+    chat_history.append({"role": "user", "content": user_message})
+    chat_history.append({"role": "assistant", "content": "".join(parts)})
+
+
+class ChatEngine:
+    def __init__(
+        self,
+        vector_store=None,
+        llm_client=None,
+        db_scope=session_scope,
+        mailer=None,
+        stream: bool = STREAM_RESPONSES,
+        answer_cache=None,
+    ):
+        self.vector_store = vector_store
+        self.llm_client = llm_client
+        self.db_scope = db_scope
+        self.mailer = mailer
+        self.stream = stream
+        self.answer_cache = answer_cache
+
+    def new_session(self) -> ChatSession:
+        return ChatSession()
+
+    def handle(self, session: ChatSession, user_message: str, vector_store=None) -> Union[str, Iterator[str]]:
+        """
+        Handles user chat, booking flow, and fallbacks if LLM is unavailable.
+        RAG answers are returned as a generator of text pieces when
+        streaming is enabled; everything else is a plain string.
+        """
+        with span("chat_turn", mode=session.mode), self.db_scope() as db:
+            return self._handle(session, user_message, db, vector_store if vector_store is not None else self.vector_store)
+
+    def _handle(self, session: ChatSession, user_message: str, db, vector_store):
+        booking = session.booking
+
+        # Basic greeting logic
+        if "book" in user_message.lower() and "consult" in user_message.lower():
+            session.mode = "booking"
+            return "Great! Let's book a NeoConsult AI project consultation. First, may I have your full name?"
+
+        if session.mode != "booking":
+            return self._answer(session, user_message, vector_store)
+
+        missing = next((f for f in BOOKING_FIELDS if f not in booking), None)
+        value = user_message.strip()
+        if missing is not None and value.lower() == "cancel":
+            session.reset_booking()
+            return "Booking cancelled. You can start again anytime."
+        if missing == "email" and not is_valid_email(value):
+            return "That doesn't look like a valid email. Please enter a valid email address."
+        if missing == "date":
+            date_obj = parse_booking_date(value)
+            if date_obj is None:
+                return "Sorry, I couldn't read that date. Please provide the date in YYYY-MM-DD format."
+            value = date_obj.isoformat()
+        if missing == "time":
+            time_obj = parse_booking_time(value)
+            if time_obj is None:
+                return "Sorry, I couldn't read that time. Please enter the time in HH:MM 24-hour format."
+            if not is_slot_time(time_obj):
+                return f"{slot_rules()} Please enter another time (HH:MM 24-hour format)."
+            slot = slot_availability_tool(db, parse_booking_date(booking["date"]), time_obj)
+            if not slot["available"]:
+                return (
+                    "Sorry, that slot is already fully booked. "
+                    f"{format_slot_suggestions(slot['suggestions'])}\n\n"
+                    "Please enter another time (HH:MM 24-hour format)."
+                )
+            value = time_obj.strftime("%H:%M")
+        if missing is not None:
+            booking[missing] = value
+            if missing != "time":
+                return NEXT_QUESTION[missing]
+            # Same key for every "yes" to this summary, so retries don't double-book
+            session.booking_key = uuid.uuid4().hex
+            # Show summary for confirmation
+            return (
+                f"Please confirm your project consultation details:\n\n"
+                f"**Name:** {booking['name']}\n"
+                f"**Company:** {booking['company']}\n"
+                f"**Email:** {booking['email']}\n"
+                f"**Phone:** {booking['phone']}\n"
+                f"**Project Type:** {booking['booking_type']}\n"
+                f"**Date:** {booking['date']}\n"
+                f"**Time:** {booking['time']}\n\n"
+                "Type 'yes' to confirm or 'no' to cancel."
+            )
+
+        if user_message.lower() == "yes":
+            return self._confirm(session, db)
+        if user_message.lower() == "no":
+            session.reset_booking()
+            return "Booking cancelled. You can start again anytime."
+        return "Type 'yes' to confirm or 'no' to cancel."
+
+    def _confirm(self, session: ChatSession, db) -> str:
+        booking = session.booking
+        payload = {
+            "name": booking["name"],
+            "company": booking["company"],
+            "email": booking["email"],
+            "phone": booking["phone"],
+            "booking_type": booking["booking_type"],
+            "date": datetime.strptime(booking["date"], "%Y-%m-%d"),
+            "time": datetime.strptime(booking["time"], "%H:%M").time(),
+        }
+
+        result = booking_persistence_tool(
+            db,
+            payload,
+            idempotency_key=session.booking_key,
+            confirmation_email={
+                "subject": "NeoConsult Project Consultation Confirmation",
+                "body": (
+                    f"Dear {booking['name']},\n\n"
+                    f"Your NeoConsult AI Project Consultation is confirmed.\n"
+                    f"Date: {booking['date']} at {booking['time']}\n\n"
+                    "Thank you for booking with NeoConsult!"
+                ),
+            },
+            mailer=self.mailer,
+        )
+
+        if result["success"]:
+            msg = f" Booking confirmed! A confirmation email will be sent to {booking['email']} shortly."
+            session.reset_booking()
+            return msg
+        if result.get("slot_taken"):
+            # Someone else confirmed this slot first: ask for a new time
+            slot = slot_availability_tool(db, payload["date"].date(), payload["time"])
+            del booking["time"]
+            return (
+                f"Sorry, {result['error']} "
+                f"{format_slot_suggestions(slot['suggestions'])}\n\n"
+                "Please enter another time (HH:MM 24-hour format)."
+            )
+        return f"Booking failed: {result['error']}"
+
+    def _answer(self, session: ChatSession, user_message: str, vector_store):
+        """RAG mode for Q&A."""
+        chat_history = session.chat_history
+        try:
+            answer = rag_tool(
+                user_message,
+                vector_store,
+                chat_history,
+                stream=self.stream,
+                llm_client=self.llm_client,
+                answer_cache=self.answer_cache,
+            )
+            if not isinstance(answer, str):
+                return _record_streamed_answer(user_message, answer, chat_history)
+            chat_history.append({"role": "user", "content": user_message})
+            chat_history.append({"role": "assistant", "content": answer})
+            return answer
+        except Exception:
+            return "I'm currently unable to use the language model service, but you can still book a consultation."
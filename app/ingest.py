@@ -0,0 +1,211 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+from PyPDF2 import PdfReader
+from .chunking import SPAN_DTYPE, ChunkedDocument, chunk_spans
+from .sentence_index import SentenceIndex
+from .config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    EMBED_BATCH_SIZE,
+    INGEST_PAGES_PER_TASK,
+    INGEST_WORKERS,
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _worker_count() -> int:
+    return INGEST_WORKERS or os.cpu_count() or 1
+
+
+def get_executor():
+    """
+    Shared process pool for page extraction, or None when running with a
+    single worker. Uses "spawn" so workers do not inherit the parent's
+    threads or loaded models.
+    """
+    global _executor
+    if _worker_count() <= 1:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=_worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[str]:
+    """Worker task: extract text of pages [start, stop) from a PDF on disk."""
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pages(files: List[Tuple[str, bytes]], errors: List[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (doc_id, page_text) for every page of every file, in order.
+
+    Page ranges of all files are extracted in parallel; at most two tasks per
+    worker are in flight so finished pages do not pile up ahead of the
+    consumer. Files that cannot be parsed, or fail part-way through
+    extraction, are skipped and their ids appended to `errors`; pages
+    already yielded for such a file must be discarded by the caller.
+    """
+    executor = get_executor()
+    failed = set()
+
+    def fail(doc_id):
+        if doc_id not in failed:
+            failed.add(doc_id)
+            if errors is not None:
+                errors.append(doc_id)
+
+    tmp_paths = []
+    tasks = []
+    for doc_id, data in files:
+        try:
+            n_pages = len(PdfReader(io.BytesIO(data)).pages)
+        except Exception:
+            fail(doc_id)
+            continue
+        if executor is None:
+            tasks.append((doc_id, data))
+            continue
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        tmp_paths.append(path)
+        for start in range(0, n_pages, INGEST_PAGES_PER_TASK):
+            tasks.append((doc_id, path, start, min(start + INGEST_PAGES_PER_TASK, n_pages)))
+
+    try:
+        if executor is None:
+            for doc_id, data in tasks:
+                try:
+                    for page in PdfReader(io.BytesIO(data)).pages:
+                        text = page.extract_text() or ""
+                        yield doc_id, text
+                except Exception:
+                    fail(doc_id)
+            return
+
+        pending = deque()
+        todo = iter(tasks)
+        max_inflight = 2 * _worker_count()
+        for doc_id, path, start, stop in todo:
+            pending.append((doc_id, executor.submit(_extract_pages, path, start, stop)))
+            if len(pending) >= max_inflight:
+                break
+        while pending:
+            doc_id, future = pending.popleft()
+            for task in todo:
+                pending.append((task[0], executor.submit(_extract_pages, *task[1:])))
+                break
+            try:
+                page_texts = future.result()
+            except Exception:
+                fail(doc_id)
+                continue
+            if doc_id in failed:
+                continue  # a page range of this file already failed
+            for page_text in page_texts:
+                yield doc_id, page_text
+    finally:
+        for path in tmp_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def iter_chunks(
+    pages: Iterable[Tuple[str, bytes]],
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+) -> Iterator[Tuple[Tuple[str, int, int, int], str]]:
+    """
+    Streaming chunker: for (doc_id, page_bytes) pairs yield
+    ((doc_id, page, start, end), chunk) as pages arrive, holding one page
+    at a time. Offsets are into the document's pages concatenated in
+    order; chunks never cross a page (see chunking.chunk_spans).
+    """
+    doc_id, page_no, offset = None, 0, 0
+    for page_doc, data in pages:
+        if page_doc != doc_id:
+            doc_id, page_no, offset = page_doc, 0, 0
+        for start, end in chunk_spans(data, chunk_size, overlap):
+            yield (doc_id, page_no, offset + start, offset + end), data[start:end].decode("utf-8")
+        offset += len(data)
+        page_no += 1
+
+
+def iter_embedded_batches(
+    chunks: Iterable[Tuple[object, str]],
+    encode: Callable[[List[str]], np.ndarray],
+    batch_size: int = EMBED_BATCH_SIZE,
+) -> Iterator[Tuple[list, List[str], np.ndarray]]:
+    """Group streamed (key, chunk) pairs into fixed-size batches and encode each one."""
+    keys, texts = [], []
+    for key, chunk in chunks:
+        keys.append(key)
+        texts.append(chunk)
+        if len(texts) >= batch_size:
+            yield keys, texts, encode(texts)
+            keys, texts = [], []
+    if texts:
+        yield keys, texts, encode(texts)
+
+
+def ingest_documents(
+    files: List[Tuple[str, bytes]],
+    encode: Callable[[List[str]], np.ndarray],
+    errors: List[str] = None,
+) -> Dict[str, Tuple[ChunkedDocument, np.ndarray]]:
+    """
+    Run extraction -> chunking -> embedding as one stream and return
+    {doc_id: (document, embeddings)} for every file that produced text.
+    Chunk texts are only held until their batch is encoded; documents
+    keep the page text once plus (page, start, end) spans and the
+    sentence index the extractive fallback scores against.
+    """
+    texts: Dict[str, List[bytes]] = {}
+    spans: Dict[str, list] = {}
+    blocks: Dict[str, List[np.ndarray]] = {}
+
+    def pages():
+        for doc_id, page_text in iter_pages(files, errors):
+            data = page_text.encode("utf-8") + b"\n"
+            texts.setdefault(doc_id, []).append(data)
+            yield doc_id, data
+
+    for keys, _, embeddings in iter_embedded_batches(iter_chunks(pages()), encode):
+        start = 0
+        while start < len(keys):
+            doc_id = keys[start][0]
+            end = start
+            while end < len(keys) and keys[end][0] == doc_id:
+                end += 1
+            spans.setdefault(doc_id, []).extend(k[1:] for k in keys[start:end])
+            blocks.setdefault(doc_id, []).append(embeddings[start:end])
+            start = end
+    return {
+        d: (
+            ChunkedDocument(
+                b"".join(texts[d]),
+                np.array(spans[d], dtype=SPAN_DTYPE),
+                SentenceIndex.build(texts[d]),
+            ),
+            np.vstack(blocks[d]).astype("float32"),
+        )
+        for d in spans
+        if not errors or d not in errors
+    }
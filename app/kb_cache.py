@@ -0,0 +1,101 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from .config import (
+    RAG_EMBED_MODEL,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    KB_CACHE_MAX_BYTES,
+    KB_CACHE_MAX_STORES,
+)
+
+
+def settings_fingerprint() -> str:
+    """Settings that change the chunks or vectors produced for a file."""
+    return f"{RAG_EMBED_MODEL}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|sentence-pages"
+
+
+def file_cache_key(data: bytes) -> str:
+    """Content address of an uploaded file under the current settings."""
+    digest = hashlib.sha256(data)
+    digest.update(settings_fingerprint().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def corpus_cache_key(file_keys: Iterable[str]) -> str:
+    """Content address of a set of files (upload order does not matter)."""
+    return hashlib.sha256("|".join(sorted(set(file_keys))).encode("utf-8")).hexdigest()
+
+
+class KnowledgeBaseCache:
+    """
+    Process-wide LRU cache for the knowledge base:
+    - per-file (ChunkedDocument, embeddings), bounded by approximate size in bytes
+    - assembled vector stores, bounded by count
+    """
+
+    def __init__(self, max_bytes: int = KB_CACHE_MAX_BYTES, max_stores: int = KB_CACHE_MAX_STORES):
+        self.max_bytes = max_bytes
+        self.max_stores = max_stores
+        self._files: "OrderedDict[str, Tuple[object, object, int]]" = OrderedDict()
+        self._stores: "OrderedDict[str, object]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_file(self, key: str) -> Optional[Tuple[object, object]]:
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._files.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put_file(self, key: str, document, embeddings):
+        size = int(getattr(embeddings, "nbytes", 0)) + document.nbytes
+        with self._lock:
+            old = self._files.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._files[key] = (document, embeddings, size)
+            self._bytes += size
+            # Always keep the newest entry, even if it alone exceeds the budget
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                _, (_, _, evicted) = self._files.popitem(last=False)
+                self._bytes -= evicted
+
+    def get_store(self, key: str):
+        with self._lock:
+            store = self._stores.get(key)
+            if store is not None:
+                self._stores.move_to_end(key)
+            return store
+
+    def put_store(self, key: str, store):
+        with self._lock:
+            self._stores[key] = store
+            self._stores.move_to_end(key)
+            while len(self._stores) > self.max_stores:
+                self._stores.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "stores": len(self._stores),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_kb_cache = KnowledgeBaseCache()
+
+
+def get_kb_cache() -> KnowledgeBaseCache:
+    """One knowledge-base cache shared by every session in this process."""
+    return _kb_cache
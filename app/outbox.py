@@ -0,0 +1,164 @@
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from db.database import SessionLocal, claim_due_emails, mark_email_sent, mark_email_failed
+from utils.env import get_setting
+from utils.tracing import span
+from utils.validators import is_deliverable_email
+from .config import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_BACKOFF_SECONDS,
+    OUTBOX_MAX_BACKOFF_SECONDS,
+    OUTBOX_POLL_SECONDS,
+    OUTBOX_LEASE_SECONDS,
+    SMTP_IDLE_SECONDS,
+)
+
+
+def build_message(from_email: str, to_email: str, subject: str, body: str) -> MIMEMultipart:
+    """Plain-text email as sent by email_tool and the outbox sender."""
+    msg = MIMEMultipart()
+    msg["From"] = from_email
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "plain"))
+    return msg
+
+
+class OutboxSender:
+    """
+    Background thread that delivers queued emails from the email_outbox
+    table. One authenticated SMTP connection is reused across messages and
+    batches and closed after SMTP_IDLE_SECONDS without work. Failed sends
+    are retried with exponential backoff up to OUTBOX_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, smtp_settings: dict, session_factory=SessionLocal):
+        self.smtp_settings = smtp_settings
+        self.session_factory = session_factory
+        self._smtp = None
+        self._last_used = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="outbox-sender", daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        """Ask the sender to look at the outbox now instead of at the next poll."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.process_due()
+            except Exception:
+                sent = 0
+            if sent:
+                continue  # more may be waiting
+            if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_SECONDS:
+                self._close()
+            self._wake.wait(OUTBOX_POLL_SECONDS)
+            self._wake.clear()
+        self._close()
+
+    def process_due(self) -> int:
+        """Send one batch of due emails. Returns how many were claimed."""
+        db = self.session_factory()
+        try:
+            emails = claim_due_emails(db, OUTBOX_BATCH_SIZE, OUTBOX_LEASE_SECONDS)
+            # Idle polls are not traced; only batches with work are
+            if not emails:
+                return 0
+            with span("outbox.batch", emails=len(emails)):
+                for email in emails:
+                    # Checked here rather than on the chat path: DNS may be slow
+                    deliverable = is_deliverable_email(email.to_email)
+                    if deliverable is False:
+                        mark_email_failed(db, email, "Email domain does not accept mail.", None)
+                        db.commit()
+                        continue
+                    if deliverable is None:
+                        error = "Could not check the email domain (DNS error)."
+                        mark_email_failed(db, email, error, self._retry_at(email.attempts + 1))
+                        db.commit()
+                        continue
+                    try:
+                        self._send(email)
+                        mark_email_sent(db, email)
+                    except Exception as e:
+                        mark_email_failed(db, email, str(e), self._retry_at(email.attempts + 1))
+                    db.commit()
+            return len(emails)
+        finally:
+            db.close()
+
+    def _retry_at(self, attempts: int):
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            return None
+        delay = min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS)
+        return datetime.utcnow() + timedelta(seconds=delay)
+
+    def _send(self, email):
+        msg = build_message(self.smtp_settings["user"], email.to_email, email.subject, email.body)
+        with span("smtp.send", pooled=self._smtp is not None):
+            try:
+                self._connection().send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # Pooled connection went stale: reconnect once and retry
+                self._close()
+                self._connection().send_message(msg)
+        self._last_used = time.monotonic()
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            s = self.smtp_settings
+            server = smtplib.SMTP(s["host"], int(s["port"]), timeout=30)
+            server.starttls()
+            server.login(s["user"], s["password"])
+            self._smtp = server
+            self._last_used = time.monotonic()
+        return self._smtp
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+def load_smtp_settings() -> dict:
+    """SMTP settings from the EMAIL_* environment variables or Streamlit secrets."""
+    return {
+        "host": get_setting("EMAIL_HOST", ""),
+        "port": get_setting("EMAIL_PORT", 587),
+        "user": get_setting("EMAIL_USER", ""),
+        "password": get_setting("EMAIL_PASSWORD", ""),
+    }
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_outbox_sender() -> OutboxSender:
+    """Start the process-wide outbox sender on first use."""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = OutboxSender(load_smtp_settings()).start()
+        return _sender
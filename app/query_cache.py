@@ -0,0 +1,19 @@
+import re
+from utils.ttl_cache import TTLCache
+from .config import QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+
+_WS_RE = re.compile(r"\s+")
+_TRAILING_PUNCT = "?!.,;: "
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a question used as a cache key."""
+    return _WS_RE.sub(" ", query.lower()).strip(_TRAILING_PUNCT)
+
+
+_query_embedding_cache = TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+
+
+def get_query_embedding_cache() -> TTLCache:
+    """Normalized query -> embedding, shared by every session in this process."""
+    return _query_embedding_cache
@@ -1,87 +1,567 @@
+import hashlib
 import io
-from typing import List, Tuple
-import streamlit as st
-from sentence_transformers import SentenceTransformer
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Dict, List, Optional, Tuple, Union
 import numpy as np
-import faiss
 from PyPDF2 import PdfReader
-from .config import RAG_EMBED_MODEL, EMBED_DIM
+from utils.lazy import lazy_import
+from utils.tracing import span, traced
+from .config import (
+    RAG_EMBED_MODEL,
+    EMBED_DIM,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    VECTOR_STORE_DIR,
+    VECTOR_INDEX_MODE,
+    VECTOR_INDEX_PQ,
+    ANN_MIN_VECTORS,
+    IVF_MIN_VECTORS,
+    IVF_NPROBE,
+    HNSW_M,
+    HNSW_EF_SEARCH,
+    PQ_M,
+    RECALL_K,
+    RECALL_SAMPLE_QUERIES,
+    RECALL_SCAN_ROWS,
+    RESULT_CACHE_SIZE,
+    QUERY_CACHE_TTL,
+    RETRIEVAL_MODE,
+    HYBRID_CANDIDATES,
+)
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .chunking import ChunkTable, ChunkedDocument, chunk_spans
+from .embedding_service import load_embedder, get_embedding_service
+from .ingest import ingest_documents
+from .kb_cache import get_kb_cache, file_cache_key, corpus_cache_key, settings_fingerprint
+from .query_cache import TTLCache, get_query_embedding_cache, normalize_query
 
+faiss = lazy_import("faiss")
 
-@st.cache_resource
-def load_embedder():
-    """Load sentence-transformer model once per session."""
-    return SentenceTransformer(RAG_EMBED_MODEL)
+# Bump whenever the on-disk layout written by SimpleVectorStore.save changes
+STORE_FORMAT_VERSION = 5
+
+# Fewer vectors than this cannot train IVF centroids or PQ codebooks (256 codes)
+MIN_TRAIN_VECTORS = 256
+
+
+def extract_text_from_bytes(data: bytes) -> str:
+    """Extract plain text from raw PDF bytes."""
+    reader = PdfReader(io.BytesIO(data))
+    return "".join((page.extract_text() or "") + "\n" for page in reader.pages)
 
 
 def extract_text_from_pdf(file) -> str:
     """Extract plain text from a PDF file-like object."""
-    reader = PdfReader(io.BytesIO(file.read()))
-    text = ""
-    for page in reader.pages:
-        page_text = page.extract_text() or ""
-        text += page_text + "\n"
-    return text
-
-
-def chunk_text(text: str, chunk_size: int = 800, overlap: int = 100) -> List[str]:
-    """Split long text into overlapping word chunks."""
-    words = text.split()
-    chunks = []
-    start = 0
-    while start < len(words):
-        end = start + chunk_size
-        chunks.append(" ".join(words[start:end]))
-        start += max(chunk_size - overlap, 1)
-    return chunks
+    return extract_text_from_bytes(file.read())
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split long text into overlapping, sentence-aligned word chunks."""
+    data = text.encode("utf-8")
+    return [data[start:end].decode("utf-8") for start, end in chunk_spans(data, chunk_size, overlap)]
+
+
+def embed_chunks(chunks: List[str]) -> np.ndarray:
+    """Encode chunks into a float32 embedding matrix."""
+    if not chunks:
+        return np.zeros((0, EMBED_DIM), dtype="float32")
+    model = load_embedder()
+    return model.encode(chunks, show_progress_bar=False).astype("float32")
+
+
+def choose_index_mode(n_vectors: int, mode: str = VECTOR_INDEX_MODE) -> str:
+    """
+    Resolve "auto" to flat / hnsw / ivf based on corpus size. Corpora too
+    small to train a quantizer always use the exact flat index.
+    """
+    if n_vectors < MIN_TRAIN_VECTORS:
+        return "flat"
+    if mode != "auto":
+        return mode
+    if n_vectors < ANN_MIN_VECTORS:
+        return "flat"
+    if n_vectors < IVF_MIN_VECTORS:
+        return "hnsw"
+    return "ivf"
+
+
+def make_index(embeddings: np.ndarray, mode: str, pq: bool = VECTOR_INDEX_PQ):
+    """
+    Create an empty ID-mapped FAISS index of the given mode, trained on
+    `embeddings` when the index type needs training.
+    """
+    n, dim = embeddings.shape
+    if mode == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+    if mode == "ivf":
+        nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+        spec = f"IVF{nlist},PQ{PQ_M}" if pq else f"IVF{nlist},Flat"
+        inner = faiss.index_factory(dim, spec)
+        inner.train(embeddings)
+        inner.nprobe = IVF_NPROBE
+    elif mode == "hnsw":
+        inner = faiss.IndexHNSWPQ(dim, PQ_M, HNSW_M) if pq else faiss.IndexHNSWFlat(dim, HNSW_M)
+        if not inner.is_trained:
+            inner.train(embeddings)
+        inner.hnsw.efSearch = HNSW_EF_SEARCH
+    else:
+        raise ValueError(f"Unknown vector index mode: {mode}")
+    return faiss.IndexIDMap2(inner)
+
+
+def exact_knn(base: np.ndarray, queries: np.ndarray, k: int, batch: int = RECALL_SCAN_ROWS) -> np.ndarray:
+    """
+    Row positions of the k nearest (L2) rows of `base` for each query, best
+    first. `base` is scanned in blocks, so a memory-mapped matrix is never
+    copied whole.
+    """
+    nq = len(queries)
+    q_norms = (queries * queries).sum(axis=1)[:, None]
+    best_d = np.empty((nq, 0), dtype="float32")
+    best_i = np.empty((nq, 0), dtype="int64")
+    for start in range(0, len(base), batch):
+        block = np.asarray(base[start:start + batch], dtype="float32")
+        d = q_norms - 2.0 * (queries @ block.T) + (block * block).sum(axis=1)[None, :]
+        cand_d = np.hstack([best_d, d])
+        cand_i = np.hstack([best_i, np.broadcast_to(np.arange(start, start + len(block)), d.shape)])
+        top = min(k, cand_d.shape[1])
+        keep = np.argpartition(cand_d, top - 1, axis=1)[:, :top]
+        best_d = np.take_along_axis(cand_d, keep, axis=1)
+        best_i = np.take_along_axis(cand_i, keep, axis=1)
+    order = np.argsort(best_d, axis=1)
+    return np.take_along_axis(best_i, order, axis=1)
 
 
 class SimpleVectorStore:
-    """Lightweight in-memory vector store using FAISS."""
+    """
+    Lightweight in-memory vector store using FAISS.
+
+    Chunks are tracked per document and carry stable int64 ids in an
+    ID-mapped index, so documents can be added or removed without
+    re-embedding the rest of the corpus. Chunk texts live in a ChunkTable
+    (spans into each document's text, with source pages). The index type
+    follows VECTOR_INDEX_MODE (exact flat, IVF or HNSW); a BM25 index over
+    the same chunks serves sparse and hybrid queries.
+    """
 
     def __init__(self):
         self.index = None
+        self.bm25: Optional[BM25Index] = None
         self.embeddings = None
-        self.chunks: List[str] = []
+        self.chunks = ChunkTable()
+        self.chunk_ids = np.zeros(0, dtype=np.int64)
+        self._next_id = 0
+        self._id_to_pos = None
+        self._mapped = False
+        self.index_mode = "flat"
+        self.recall_at_k: Optional[Tuple[int, float]] = None
+        self.version = 0
+        self._result_cache = TTLCache(RESULT_CACHE_SIZE, QUERY_CACHE_TTL)
+        self._bm25_lock = threading.Lock()
 
-    def build_index(self, chunks: List[str]):
+    def build_index(self, chunks: List[str], embeddings: np.ndarray = None):
+        """Replace the store contents with one document made of `chunks`."""
+        self.__init__()
         if not chunks:
             return
-        model = load_embedder()
-        self.chunks = chunks
-        embeddings = model.encode(chunks, show_progress_bar=False)
-        self.embeddings = embeddings.astype("float32")
-        dim = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(self.embeddings)
-
-    def similarity_search(self, query: str, k: int = 4) -> List[Tuple[str, float]]:
-        """Return top-k (chunk, distance) pairs."""
+        doc_id = hashlib.sha256("\x00".join(chunks).encode("utf-8")).hexdigest()
+        self.add_documents({doc_id: chunks}, {doc_id: embeddings})
+
+    @property
+    def doc_ids(self) -> List[str]:
+        """Ids of the documents currently in the store, in insertion order."""
+        return list(self.chunks.documents)
+
+    @property
+    def corpus_id(self) -> str:
+        """Content address of the indexed document set (see corpus_cache_key)."""
+        return corpus_cache_key(self.doc_ids)
+
+    def add_documents(
+        self,
+        documents: Dict[str, Union[ChunkedDocument, List[str]]],
+        embeddings: Optional[Dict[str, np.ndarray]] = None,
+    ):
+        """
+        Add documents given as {doc_id: ChunkedDocument or list of chunks}.
+        Only chunks without a precomputed entry in `embeddings` are
+        encoded. Existing documents with the same id are replaced.
+        """
+        embeddings = embeddings or {}
+        documents = {
+            d: doc if isinstance(doc, ChunkedDocument) else ChunkedDocument.from_chunks(list(doc))
+            for d, doc in documents.items()
+        }
+        documents = {d: doc for d, doc in documents.items() if len(doc)}
+        if not documents:
+            return
+        for doc_id in documents:
+            if doc_id in self.chunks.documents:
+                self.remove_document(doc_id)
+        self._make_writable()
+
+        to_embed = [d for d in documents if embeddings.get(d) is None]
+        fresh = embed_chunks([c for d in to_embed for c in documents[d]])
+        blocks, pos, count = [], 0, 0
+        for doc_id, doc in documents.items():
+            emb = embeddings.get(doc_id)
+            if emb is None:
+                emb = fresh[pos:pos + len(doc)]
+                pos += len(doc)
+            self.chunks.append(doc_id, doc)
+            count += len(doc)
+            blocks.append(np.asarray(emb, dtype="float32"))
+        new_emb = np.ascontiguousarray(np.vstack(blocks), dtype="float32")
+        new_ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+        self._next_id += count
+
+        self.embeddings = new_emb if self.index is None else np.vstack([self.embeddings, new_emb])
+        self.chunk_ids = np.concatenate([self.chunk_ids, new_ids])
+        self._id_to_pos = None
+        if self.index is None or choose_index_mode(len(self.chunk_ids)) != self.index_mode:
+            self._rebuild_index()
+        else:
+            self.index.add_with_ids(new_emb, new_ids)
+        self._changed()
+
+    def remove_document(self, doc_id: str) -> int:
+        """Drop a document's chunks and vectors. Returns the number removed."""
+        mask = self.chunks.doc_mask(doc_id)
+        removed = int(mask.sum())
+        if not removed:
+            return 0
+        self._make_writable()
+        keep = np.flatnonzero(~mask)
+        self.chunks = self.chunks.take(keep)
+        self.embeddings = self.embeddings[keep]
+        self._id_to_pos = None
+        if not len(self.chunks):
+            version = self.version
+            self.__init__()
+            self.version = version + 1
+            return removed
+        try:
+            self.index.remove_ids(self.chunk_ids[mask])
+            self.chunk_ids = self.chunk_ids[keep]
+        except RuntimeError:
+            # HNSW cannot delete vectors: rebuild from the kept embeddings
+            self.chunk_ids = self.chunk_ids[keep]
+            self._rebuild_index()
+        self._changed()
+        return removed
+
+    def _changed(self):
+        """
+        Bump the corpus version, drop cached search results and mark the
+        BM25 index stale; it is rebuilt on the next sparse or hybrid query,
+        so a batch of adds/removes costs one build (none in dense mode).
+        """
+        self.version += 1
+        self.bm25 = None
+        self._result_cache.clear()
+
+    def bm25_index(self) -> BM25Index:
+        """The BM25 index over the current chunks, built on first use after a change."""
+        bm25 = self.bm25
+        if bm25 is None:
+            with self._bm25_lock:
+                bm25 = self.bm25
+                if bm25 is None:
+                    with span("bm25.build", chunks=len(self.chunks)):
+                        bm25 = self.bm25 = BM25Index.build(self.chunks)
+        return bm25
+
+    def _rebuild_index(self):
+        """(Re)create the index from the stored embeddings; no re-embedding."""
+        self.index_mode = choose_index_mode(len(self.chunk_ids))
+        self.index = make_index(self.embeddings, self.index_mode)
+        self.index.add_with_ids(self.embeddings, self.chunk_ids)
+        self.recall_at_k = None
+
+    def measure_recall(self, k: int = RECALL_K, n_queries: int = RECALL_SAMPLE_QUERIES) -> float:
+        """
+        Recall@k of the current index against exact search, using stored
+        vectors as sample queries. Also kept in `self.recall_at_k`.
+        """
+        if self.index is None:
+            return 0.0
+        if self.index_mode == "flat":
+            self.recall_at_k = (k, 1.0)
+            return 1.0
+        rng = np.random.default_rng(0)
+        n = len(self.chunk_ids)
+        sample = rng.choice(n, size=min(n_queries, n), replace=False)
+        queries = np.ascontiguousarray(self.embeddings[sample], dtype="float32")
+        true_pos = exact_knn(self.embeddings, queries, k)
+        _, approx_ids = self.index.search(queries, k)
+        hits = 0
+        for truth, approx in zip(true_pos, approx_ids):
+            hits += len(set(self.chunk_ids[truth[truth >= 0]]) & set(approx[approx >= 0]))
+        recall = hits / float(len(sample) * k)
+        self.recall_at_k = (k, recall)
+        return recall
+
+    def _make_writable(self):
+        """
+        Copy memory-mapped vectors into the heap before the first mutation.
+        Chunk text buffers are never written, so they stay mapped.
+        """
+        if not self._mapped:
+            return
+        self.embeddings = np.array(self.embeddings, dtype="float32")
+        self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+        self._mapped = False
+
+    def _position(self, chunk_id: int) -> int:
+        if self._id_to_pos is None:
+            self._id_to_pos = {int(cid): pos for pos, cid in enumerate(self.chunk_ids)}
+        return self._id_to_pos.get(int(chunk_id), -1)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Return the (1, dim) query embedding, cached by normalized text."""
+        cache = get_query_embedding_cache()
+        key = (RAG_EMBED_MODEL, normalize_query(query))
+        q_emb = cache.get(key)
+        if q_emb is None:
+            with span("embed_query"):
+                q_emb = get_embedding_service().encode([query])
+            cache.put(key, q_emb)
+        return q_emb
+
+    def _dense_search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        q_emb = self.embed_query(query)
+        with span("faiss.search", k=k):
+            distances, ids = self.index.search(q_emb, k)
+        keep = ids[0] >= 0
+        return ids[0][keep], distances[0][keep]
+
+    def _sparse_search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        bm25 = self.bm25_index()
+        with span("bm25.search", k=k):
+            positions, scores = bm25.search(query, k)
+        return self.chunk_ids[positions], scores
+
+    @traced("similarity_search")
+    def similarity_search_with_ids(self, query: str, k: int = 4, mode: Optional[str] = None) -> List[Tuple[int, str, float]]:
+        """
+        Return top-k (chunk_id, chunk, distance) triples, best first.
+
+        `mode` (default RETRIEVAL_MODE) picks the ranking:
+        - "dense": FAISS L2 distance between embeddings
+        - "sparse": BM25 over chunk terms; distance is 1 / score
+        - "hybrid": reciprocal rank fusion of both; distance is 1 / fused score
+        Distances are only comparable within one result list.
+        """
         if self.index is None:
             return []
-        model = load_embedder()
-        q_emb = model.encode([query]).astype("float32")
-        distances, indices = self.index.search(q_emb, k)
+        mode = mode or RETRIEVAL_MODE
+        key = (self.version, normalize_query(query), k, mode)
+        hit = self._result_cache.get(key)
+        if hit is None:
+            if mode == "dense":
+                hit = self._dense_search(query, k)
+            elif mode == "sparse":
+                ids, scores = self._sparse_search(query, k)
+                hit = (ids, 1.0 / scores)
+            elif mode == "hybrid":
+                n = max(k, HYBRID_CANDIDATES)
+                dense_ids, _ = self._dense_search(query, n)
+                sparse_ids, _ = self._sparse_search(query, n)
+                fused = reciprocal_rank_fusion([dense_ids.tolist(), sparse_ids.tolist()], k)
+                hit = ([cid for cid, _ in fused], [1.0 / score for _, score in fused])
+            else:
+                raise ValueError(f"Unknown retrieval mode: {mode}")
+            self._result_cache.put(key, hit)
         results = []
-        for idx, dist in zip(indices[0], distances[0]):
-            if 0 <= idx < len(self.chunks):
-                results.append((self.chunks[idx], float(dist)))
+        for cid, dist in zip(*hit):
+            pos = self._position(cid)
+            if pos >= 0:
+                results.append((int(cid), self.chunks[pos], float(dist)))
         return results
 
+    def source(self, chunk_id: int) -> Optional[Tuple[str, Optional[int]]]:
+        """(doc_id, 1-based page or None) a chunk was taken from."""
+        pos = self._position(chunk_id)
+        if pos < 0:
+            return None
+        return self.chunks.doc_id(pos), self.chunks.page(pos)
+
+    def sentence_parts(self, chunk_ids: List[int]) -> list:
+        """Precomputed sentences of the given chunks, for the extractive fallback."""
+        positions = [p for p in (self._position(cid) for cid in chunk_ids) if p >= 0]
+        return self.chunks.sentence_parts(positions)
+
+    def similarity_search(self, query: str, k: int = 4, mode: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Return top-k (chunk, distance) pairs (see similarity_search_with_ids)."""
+        return [(chunk, dist) for _, chunk, dist in self.similarity_search_with_ids(query, k, mode)]
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the query-embedding and search-result caches."""
+        return {
+            "query_embeddings": get_query_embedding_cache().stats(),
+            "results": self._result_cache.stats(),
+        }
+
+    def save(self, path: str):
+        """
+        Write the store to a directory:
+        manifest.json, index.faiss, embeddings.npy, chunk_ids.npy, the
+        chunk table (text.bin, text_offsets.npy, chunks.npy, documents.json)
+        and the BM25 index (bm25_*.npy).
+        The directory is written next to `path` and renamed into place.
+        """
+        if self.index is None:
+            raise ValueError("Cannot save an empty vector store.")
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        tmp = f"{path}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp)
+        try:
+            self.chunks.save(tmp)
+            self.bm25_index().save(tmp)
+            np.save(os.path.join(tmp, "embeddings.npy"), np.asarray(self.embeddings, dtype="float32"))
+            np.save(os.path.join(tmp, "chunk_ids.npy"), self.chunk_ids)
+            faiss.write_index(self.index, os.path.join(tmp, "index.faiss"))
+            manifest = {
+                "format_version": STORE_FORMAT_VERSION,
+                "settings": settings_fingerprint(),
+                "count": len(self.chunks),
+                "dim": int(self.embeddings.shape[1]),
+                "next_id": int(self._next_id),
+                "index_mode": self.index_mode,
+                "recall_at_k": self.recall_at_k,
+            }
+            with open(os.path.join(tmp, "manifest.json"), "w") as fh:
+                json.dump(manifest, fh)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            os.replace(tmp, path)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "SimpleVectorStore":
+        """
+        Load a store written by `save`. Embeddings and chunk texts are
+        memory-mapped, so processes loading the same directory share pages.
+        """
+        with open(os.path.join(path, "manifest.json")) as fh:
+            manifest = json.load(fh)
+        if manifest.get("format_version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store format in {path}")
+        if manifest.get("settings") != settings_fingerprint():
+            raise ValueError(f"Vector store in {path} was built with different settings")
 
-def build_vectorstore_from_uploads(uploaded_files):
-    """Extract, chunk, embed uploaded PDFs and return a vector store."""
-    text = ""
+        store = cls()
+        store.chunks = ChunkTable.load(path)
+        store.bm25 = BM25Index.load(path)
+        store.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        store.chunk_ids = np.load(os.path.join(path, "chunk_ids.npy"))
+        store._next_id = manifest["next_id"]
+        store.index_mode = manifest["index_mode"]
+        if manifest.get("recall_at_k"):
+            store.recall_at_k = tuple(manifest["recall_at_k"])
+        store._mapped = True
+        index_path = os.path.join(path, "index.faiss")
+        try:
+            store.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except Exception:
+            # Older faiss builds cannot mmap every index type
+            store.index = faiss.read_index(index_path)
+        return store
+
+
+def _read_upload(f) -> bytes:
+    """Return the bytes of a Streamlit UploadedFile or any file-like object."""
+    if hasattr(f, "getvalue"):
+        return f.getvalue()
+    data = f.read()
+    if hasattr(f, "seek"):
+        f.seek(0)
+    return data
+
+
+def _store_dir(store_key: str) -> str:
+    return os.path.join(VECTOR_STORE_DIR, f"v{STORE_FORMAT_VERSION}", store_key)
+
+
+@traced("build_vectorstore_from_uploads")
+def build_vectorstore_from_uploads(uploaded_files, errors: Optional[List[str]] = None):
+    """
+    Extract, chunk, embed uploaded PDFs and return a vector store.
+    Names of files that could not be read are appended to `errors`.
+
+    New files go through the streaming ingestion pipeline (parallel page
+    extraction, batched embedding). Results are cached by file content,
+    so reruns with the same uploads reuse the existing store and a changed
+    file set only embeds new files. Stores are also persisted under
+    VECTOR_STORE_DIR so other worker processes and restarts can load them
+    without running the embedder.
+    """
+    cache = get_kb_cache()
+
+    files = []
+    seen = set()
     for f in uploaded_files:
+        data = _read_upload(f)
+        key = file_cache_key(data)
+        if key not in seen:
+            seen.add(key)
+            files.append((f, key, data))
+
+    store_key = corpus_cache_key(seen)
+    store = cache.get_store(store_key)
+    if store is not None:
+        return store
+
+    path = _store_dir(store_key)
+    if os.path.isdir(path):
         try:
-            text += extract_text_from_pdf(f)
+            store = SimpleVectorStore.load(path)
+            cache.put_store(store_key, store)
+            return store
         except Exception:
-            st.error(f"Could not read PDF: {getattr(f, 'name', 'unnamed file')}")
+            pass  # stale or partial directory: rebuild below
+
+    documents: Dict[str, ChunkedDocument] = {}
+    embeddings: Dict[str, np.ndarray] = {}
+    missing = []
+    for f, key, data in files:
+        cached = cache.get_file(key)
+        if cached is None:
+            missing.append((key, data))
+        elif len(cached[0]):
+            documents[key], embeddings[key] = cached
+
+    if missing:
+        failed: List[str] = []
+        with span("ingest_documents", files=len(missing)):
+            ingested = ingest_documents(missing, embed_chunks, failed)
+        for key, _ in missing:
+            if key in failed:
+                continue
+            doc, emb = ingested.get(key, (ChunkedDocument.from_chunks([]), embed_chunks([])))
+            cache.put_file(key, doc, emb)
+            if len(doc):
+                documents[key], embeddings[key] = doc, emb
+        if failed and errors is not None:
+            errors.extend(getattr(f, "name", "unnamed file") for f, key, _ in files if key in failed)
 
-    if not text.strip():
+    if not documents:
         return None
 
-    chunks = chunk_text(text)
     store = SimpleVectorStore()
-    store.build_index(chunks)
+    store.add_documents(documents, embeddings)
+    if store.index_mode != "flat":
+        store.measure_recall()
+    cache.put_store(store_key, store)
+    try:
+        store.save(path)
+    except OSError:
+        pass  # read-only filesystem: keep the in-memory store only
     return store
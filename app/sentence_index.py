@@ -0,0 +1,154 @@
+import re
+import zlib
+from typing import Iterable, List, Sequence, Tuple
+import numpy as np
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\w+")
+
+# Used when the query has no word longer than three characters
+DEFAULT_QUERY_WORDS = ("service", "solution", "project", "booking")
+
+
+def term_ids(words: Iterable[str]) -> np.ndarray:
+    """Sorted unique uint32 ids (crc32 of the lowercased word) for `words`."""
+    return np.unique(np.fromiter((zlib.crc32(w.lower().encode("utf-8")) for w in words), dtype=np.uint32))
+
+
+def query_terms(query: str) -> np.ndarray:
+    """Term ids of the query words the fallback summarizer matches on."""
+    words = [w for w in _WORD.findall(query) if len(w) > 3]
+    return term_ids(words or DEFAULT_QUERY_WORDS)
+
+
+class SentenceIndex:
+    """
+    Sentences of one document, built once at ingestion.
+
+    `spans` holds (start, end) byte offsets into the document text, and
+    sentence i's term ids are terms[term_offsets[i]:term_offsets[i + 1]]
+    (CSR layout). `bullets` flags sentences containing "•".
+    """
+
+    def __init__(self, spans: np.ndarray, term_offsets: np.ndarray, terms: np.ndarray, bullets: np.ndarray):
+        self.spans = spans
+        self.term_offsets = term_offsets
+        self.terms = terms
+        self.bullets = bullets
+
+    @classmethod
+    def build(cls, pages: Iterable[bytes]) -> "SentenceIndex":
+        """Split each page (UTF-8) into sentences; sentences never cross a page."""
+        spans, offsets, blocks, bullets = [], [0], [], []
+        base = 0
+        for data in pages:
+            text = data.decode("utf-8")
+            ascii_only = len(text) == len(data)
+            char_pos, byte_pos = 0, base
+            pieces = []
+            start = 0
+            for m in _SENTENCE_SPLIT.finditer(text):
+                pieces.append((start, m.start()))
+                start = m.end()
+            pieces.append((start, len(text)))
+            for a, b in pieces:
+                sentence = text[a:b].strip()
+                if not sentence:
+                    continue
+                a += len(text[a:b]) - len(text[a:b].lstrip())
+                b = a + len(sentence)
+                if ascii_only:
+                    span = (base + a, base + b)
+                else:
+                    byte_pos += len(text[char_pos:a].encode("utf-8"))
+                    end = byte_pos + len(sentence.encode("utf-8"))
+                    span = (byte_pos, end)
+                    char_pos, byte_pos = b, end
+                ids = term_ids(_WORD.findall(sentence))
+                spans.append(span)
+                blocks.append(ids)
+                offsets.append(offsets[-1] + len(ids))
+                bullets.append("•" in sentence)
+            base += len(data)
+        return cls(
+            np.array(spans, dtype=np.int64).reshape(-1, 2),
+            np.array(offsets, dtype=np.int64),
+            np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.uint32),
+            np.array(bullets, dtype=bool),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.spans.nbytes + self.term_offsets.nbytes + self.terms.nbytes + self.bullets.nbytes
+
+    def __len__(self):
+        return len(self.spans)
+
+    def between(self, start: int, end: int) -> Tuple[int, int]:
+        """Range [first, last) of sentences overlapping byte range [start, end)."""
+        first = int(np.searchsorted(self.spans[:, 1], start, side="right"))
+        last = int(np.searchsorted(self.spans[:, 0], end, side="left"))
+        return first, max(first, last)
+
+    def scores(self, first: int, last: int, terms: np.ndarray) -> np.ndarray:
+        """Query-term overlap of sentences [first, last), plus one for bullets."""
+        lo, hi = self.term_offsets[first], self.term_offsets[last]
+        hits = np.concatenate([[0], np.cumsum(np.isin(self.terms[lo:hi], terms))])
+        bounds = self.term_offsets[first:last + 1] - lo
+        return hits[bounds[1:]] - hits[bounds[:-1]] + self.bullets[first:last]
+
+    @classmethod
+    def concat(cls, indexes: Sequence["SentenceIndex"]) -> Tuple["SentenceIndex", np.ndarray]:
+        """Merge per-document indexes for saving; also returns per-document sentence offsets."""
+        counts = np.array([len(ix) for ix in indexes], dtype=np.int64)
+        doc_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        term_offsets = [np.zeros(1, dtype=np.int64)]
+        total = 0
+        for ix in indexes:
+            term_offsets.append(ix.term_offsets[1:] + total)
+            total += int(ix.term_offsets[-1])
+        merged = cls(
+            np.vstack([ix.spans for ix in indexes]) if indexes else np.zeros((0, 2), dtype=np.int64),
+            np.concatenate(term_offsets),
+            np.concatenate([ix.terms for ix in indexes]) if indexes else np.zeros(0, dtype=np.uint32),
+            np.concatenate([ix.bullets for ix in indexes]) if indexes else np.zeros(0, dtype=bool),
+        )
+        return merged, doc_offsets
+
+    def slice(self, first: int, last: int) -> "SentenceIndex":
+        """Index of sentences [first, last), e.g. one document of a merged index."""
+        lo, hi = self.term_offsets[first], self.term_offsets[last]
+        return SentenceIndex(
+            self.spans[first:last],
+            np.asarray(self.term_offsets[first:last + 1]) - lo,
+            self.terms[lo:hi],
+            self.bullets[first:last],
+        )
+
+
+def top_sentences(parts: Iterable[Tuple[SentenceIndex, object, int, int]], query: str, max_sentences: int = 6) -> List[str]:
+    """
+    Extractive summary over precomputed sentences.
+
+    `parts` are (index, text buffer, start, end) for each retrieved chunk
+    in context order. Sentences are scored by overlap with the query
+    terms; the best `max_sentences` are returned in context order (the
+    first few when nothing matches). Sentences shared by overlapping
+    chunks count once, and only the chosen ones are decoded.
+    """
+    terms = query_terms(query)
+    candidates = []
+    seen = set()
+    for index, buf, start, end in parts:
+        first, last = index.between(start, end)
+        for j, score in zip(range(first, last), index.scores(first, last, terms)):
+            if (id(index), j) in seen:
+                continue
+            seen.add((id(index), j))
+            a, b = index.spans[j]
+            candidates.append((len(candidates), int(score), buf, max(int(a), start), min(int(b), end)))
+
+    scored = [c for c in candidates if c[1] > 0] or candidates[:max_sentences]
+    scored.sort(key=lambda c: (-c[1], c[0]))
+    top = sorted(scored[:max_sentences], key=lambda c: c[0])
+    return [bytes(buf[a:b]).decode("utf-8").strip() for _, _, buf, a, b in top]
@@ -0,0 +1,359 @@
+"""
+Asyncio HTTP/WebSocket front end for the chat engine (no Streamlit).
+
+    python -m app.server [--host 127.0.0.1] [--port 8080]
+        [--pdf brochure.pdf ...] [--store DIR]
+
+HTTP, JSON bodies, one request per connection:
+    POST /sessions                   -> {"session_id": ...}
+    GET  /sessions/<id>              -> the session state (ChatSession.to_dict)
+    POST /sessions/<id>/messages     {"message": ...} -> {"reply": ...}
+    GET  /metrics                    -> stage histograms (utils/tracing.py)
+
+WebSocket, GET /ws[?session=<id>]: the server first sends
+{"type": "session", "session_id": ...}; every text message from the client
+is one user turn, answered with {"type": "token", "text": ...} messages
+as the reply streams and a final {"type": "done", "reply": ...}, or
+{"type": "error", "error": ...} when the turn failed.
+
+All connections share one event loop. Chat turns block (retrieval, LLM,
+SQLite), so they run on a pool of ENGINE_WORKERS threads; turns of one
+session are serialized by a per-session lock. Sessions idle for
+SESSION_TTL_SECONDS are gone: requests for them get 404, and a periodic
+sweep drops them from memory. The knowledge base is
+loaded once from --store (a SimpleVectorStore.save directory) or built
+from --pdf files. Secrets come from the environment: OPENAI_API_KEY and
+EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASSWORD. Streamlit does not
+need to be installed.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from db.database import init_db
+from utils import tracing
+from utils.env import get_setting
+from .config import ENGINE_WORKERS, MAX_REQUEST_BYTES, SESSION_TTL_SECONDS
+from .engine import ChatEngine, ChatSession
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT, WS_CLOSE, WS_PING, WS_PONG = 0x1, 0x8, 0x9, 0xA
+
+REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class _Entry:
+    __slots__ = ("session", "lock", "last_used")
+
+    def __init__(self, session: ChatSession):
+        self.session = session
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class SessionRegistry:
+    """In-memory sessions, each with a lock; idle ones expire."""
+
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[str, _Entry] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def create(self, session: ChatSession) -> _Entry:
+        self.expire()
+        entry = self._entries[session.session_id] = _Entry(session)
+        return entry
+
+    def get(self, session_id: Optional[str]) -> Optional[_Entry]:
+        entry = self._entries.get(session_id) if session_id else None
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if entry.last_used < now - self.ttl and not entry.lock.locked():
+            del self._entries[session_id]
+            return None
+        entry.last_used = now
+        return entry
+
+    def expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for sid in [sid for sid, e in self._entries.items() if e.last_used < cutoff and not e.lock.locked()]:
+            del self._entries[sid]
+
+    async def expire_periodically(self, interval: float = 60.0):
+        """Drop idle sessions every `interval` seconds, also when no new ones are created."""
+        while True:
+            await asyncio.sleep(min(interval, self.ttl))
+            self.expire()
+
+
+class _UnavailableLLM:
+    """Stands in when OPENAI_API_KEY is unset: every call fails, so rag_tool falls back."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        raise RuntimeError("OPENAI_API_KEY is not set")
+
+
+def engine_from_env(vector_store=None) -> ChatEngine:
+    """ChatEngine with its LLM client, outbox sender and answer cache configured from the environment."""
+    from .answer_cache import get_answer_cache
+    from .outbox import get_outbox_sender
+    from .tools import get_llm_client
+
+    llm_client = get_llm_client() if get_setting("OPENAI_API_KEY") else _UnavailableLLM()
+    return ChatEngine(
+        vector_store=vector_store,
+        llm_client=llm_client,
+        mailer=get_outbox_sender(),
+        answer_cache=get_answer_cache(),
+    )
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def _ws_read_frame(reader: asyncio.StreamReader):
+    """(fin, opcode, unmasked payload) of the next frame."""
+    b1, b2 = await reader.readexactly(2)
+    n = b2 & 0x7F
+    if n == 126:
+        (n,) = struct.unpack("!H", await reader.readexactly(2))
+    elif n == 127:
+        (n,) = struct.unpack("!Q", await reader.readexactly(8))
+    if n > MAX_REQUEST_BYTES:
+        raise ConnectionError("WebSocket frame too large")
+    mask = await reader.readexactly(4) if b2 & 0x80 else None
+    data = await reader.readexactly(n)
+    if mask and n:
+        key = int.from_bytes((mask * (n // 4 + 1))[:n], "big")
+        data = (int.from_bytes(data, "big") ^ key).to_bytes(n, "big")
+    return bool(b1 & 0x80), b1 & 0x0F, data
+
+
+class ChatServer:
+    def __init__(self, engine: ChatEngine, workers: int = ENGINE_WORKERS):
+        self.engine = engine
+        self.sessions = SessionRegistry()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chat-turn")
+
+    async def run_turn(self, entry: _Entry, message: str, on_piece=None) -> str:
+        """Run one turn off the event loop; streamed pieces go to `on_piece` as they arrive."""
+        loop = asyncio.get_running_loop()
+        async with entry.lock:
+            reply = await loop.run_in_executor(self.executor, self.engine.handle, entry.session, message)
+            if isinstance(reply, str):
+                if on_piece is not None:
+                    await on_piece(reply)
+                return reply
+            parts = []
+            done = object()
+            while True:
+                piece = await loop.run_in_executor(self.executor, next, reply, done)
+                if piece is done:
+                    return "".join(parts)
+                parts.append(piece)
+                if on_piece is not None:
+                    await on_piece(piece)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                return
+            lines = head.decode("latin-1").split("\r\n")
+            method, target = lines[0].split(" ")[:2]
+            headers = {}
+            for line in lines[1:]:
+                name, sep, value = line.partition(":")
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+
+            if headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, target, headers)
+                return
+            length = int(headers.get("content-length") or 0)
+            if length > MAX_REQUEST_BYTES:
+                status, payload = 413, {"error": "request body too large"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, payload = await self._route(method, urlsplit(target).path, body)
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+            self._respond(writer, status, payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes):
+        parts = [p for p in path.split("/") if p]
+        if method == "GET" and parts == ["metrics"]:
+            return 200, tracing.prometheus_text()
+        if method == "POST" and parts == ["sessions"]:
+            entry = self.sessions.create(self.engine.new_session())
+            return 201, {"session_id": entry.session.session_id}
+        if len(parts) in (2, 3) and parts[0] == "sessions":
+            entry = self.sessions.get(parts[1])
+            if entry is None:
+                return 404, {"error": "unknown session"}
+            if method == "GET" and len(parts) == 2:
+                return 200, entry.session.to_dict()
+            if method == "POST" and parts[2:] == ["messages"]:
+                try:
+                    message = json.loads(body or b"{}").get("message")
+                except (ValueError, AttributeError):
+                    message = None
+                if not isinstance(message, str) or not message.strip():
+                    return 400, {"error": "expected a JSON body with a non-empty 'message'"}
+                return 200, {"reply": await self.run_turn(entry, message)}
+        return 404, {"error": "not found"}
+
+    def _respond(self, writer: asyncio.StreamWriter, status: int, payload):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload, default=str).encode("utf-8"), "application/json"
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+            + body
+        )
+
+    async def _websocket(self, reader, writer, target: str, headers: dict):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            self._respond(writer, 400, {"error": "missing Sec-WebSocket-Key"})
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("latin-1")).digest()).decode("ascii")
+        writer.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode("latin-1")
+        )
+
+        session_id = parse_qs(urlsplit(target).query).get("session", [None])[0]
+        entry = self.sessions.get(session_id) or self.sessions.create(self.engine.new_session())
+
+        async def send(obj):
+            writer.write(_ws_frame(WS_TEXT, json.dumps(obj).encode("utf-8")))
+            await writer.drain()
+
+        await send({"type": "session", "session_id": entry.session.session_id})
+        fragments = []
+        while True:
+            fin, opcode, data = await _ws_read_frame(reader)
+            if opcode == WS_CLOSE:
+                writer.write(_ws_frame(WS_CLOSE, data[:2]))
+                await writer.drain()
+                return
+            if opcode == WS_PING:
+                writer.write(_ws_frame(WS_PONG, data))
+                continue
+            if opcode == WS_PONG:
+                continue
+            fragments.append(data)  # text, binary or continuation
+            if sum(len(f) for f in fragments) > MAX_REQUEST_BYTES:
+                raise ConnectionError("WebSocket message too large")
+            if not fin:
+                continue
+            message = b"".join(fragments).decode("utf-8", errors="replace").strip()
+            fragments = []
+            if message:
+                try:
+                    reply = await self.run_turn(entry, message, lambda piece: send({"type": "token", "text": piece}))
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    await send({"type": "error", "error": str(e)})
+                    continue
+                await send({"type": "done", "reply": reply})
+
+
+def load_knowledge_base(store_dir: Optional[str], pdfs) -> Optional[object]:
+    from .rag_pipeline import SimpleVectorStore, build_vectorstore_from_uploads
+
+    if store_dir:
+        return SimpleVectorStore.load(store_dir)
+    if pdfs:
+        files = [open(path, "rb") for path in pdfs]
+        unreadable = []
+        try:
+            return build_vectorstore_from_uploads(files, unreadable)
+        finally:
+            for f in files:
+                f.close()
+            for name in unreadable:
+                print(f"could not read PDF: {name}")
+    return None
+
+
+async def serve(engine: ChatEngine, host: str, port: int):
+    server = ChatServer(engine)
+    listener = await asyncio.start_server(server.handle_connection, host, port, limit=MAX_REQUEST_BYTES)
+    sweeper = asyncio.create_task(server.sessions.expire_periodically())
+    print(f"chat server listening on http://{host}:{port}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        sweeper.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--store", help="saved vector store directory to load")
+    parser.add_argument("--pdf", nargs="*", default=[], help="PDFs to build the knowledge base from")
+    args = parser.parse_args()
+
+    init_db()
+    engine = engine_from_env(load_knowledge_base(args.store, args.pdf))
+    try:
+        asyncio.run(serve(engine, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.mailer.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,44 @@
-import streamlit as st
-from openai import OpenAI
 from db.database import (
-    get_or_create_customer,
-    create_booking,
+    create_booking_with_customer,
     get_bookings_by_email,
+    get_slot_usage,
+    enqueue_email,
+    SlotUnavailableError,
 )
+from utils.env import get_setting
+from utils.tracing import record, span, traced
 from utils.validators import is_valid_email
-from .config import SYSTEM_PROMPT
+from .config import (
+    SYSTEM_PROMPT,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+    RAG_TOP_K,
+    SLOT_CAPACITY,
+    SLOT_SEARCH_DAYS,
+)
+from .booking_flow import is_slot_time, slot_rules, suggest_free_slots
+from .context_builder import build_context
+from .sentence_index import SentenceIndex, top_sentences
+from .answer_cache import get_answer_cache, answer_cache_key
+from .outbox import build_message, get_outbox_sender, load_smtp_settings
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+import time
+from datetime import timedelta
 
 
-def summarize_for_query(text: str, query: str, max_sentences: int = 6) -> str:
+def summarize_for_query(text: str, query: str, max_sentences: int = 6, parts=None) -> str:
     """
     Very simple extractive summariser:
-    - Split into sentences
+    - Split into sentences (or use the sentence index built at ingestion,
+      passed as `parts`, see SimpleVectorStore.sentence_parts)
     - Score sentences by overlap with query words
     - Return top N sentences in original order
     """
-    import re
-
-    # Normalise
-    query_words = {w.lower() for w in re.findall(r"\w+", query) if len(w) > 3}
-    # Fallback if query is tiny
-    if not query_words:
-        query_words = {"service", "solution", "project", "booking"}
-
-    # Split into sentences
-    raw_sentences = re.split(r"(?<=[.!?])\s+", text)
-    scored = []
-    for i, sent in enumerate(raw_sentences):
-        tokens = {w.lower() for w in re.findall(r"\w+", sent)}
-        score = len(tokens & query_words)
-        # Also boost sentences that contain bullets
-        if "•" in sent:
-            score += 1
-        if score > 0:
-            scored.append((i, score, sent.strip()))
-
-    if not scored:
-        # If nothing scored, just take first few sentences
-        scored = [(i, 1, s.strip()) for i, s in enumerate(raw_sentences[:max_sentences])]
-
-    # Sort by score (desc), then index (asc) to keep order
-    scored.sort(key=lambda x: (-x[1], x[0]))
-
-    # Take top N and restore original order
-    top = sorted(scored[:max_sentences], key=lambda x: x[0])
-    sentences = [s for (_, _, s) in top]
+    if parts is None:
+        data = text.encode("utf-8")
+        parts = [(SentenceIndex.build([data]), data, 0, len(data))]
+    sentences = top_sentences(parts, query, max_sentences)
 
     # Clean bullets / spacing a bit
     pretty = []
@@ -58,75 +48,201 @@ def summarize_for_query(text: str, query: str, max_sentences: int = 6) -> str:
     return "\n".join(pretty)
 
 
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """
+    OpenAI client, created (and openai imported) on the first LLM call.
+    The key is OPENAI_API_KEY from the environment or Streamlit secrets.
+    """
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            from openai import OpenAI
+
+            _llm_client = OpenAI(api_key=get_setting("OPENAI_API_KEY"))
+        return _llm_client
+
+
+@traced("fallback_answer")
+def fallback_answer(query: str, context_text: str, vector_store=None, chunk_ids=()) -> str:
+    """
+    Answer built from the retrieved chunks when the LLM is unavailable.
+    With a vector store, sentences come from its precomputed index.
+    """
+    if context_text.strip():
+        # Build a focused summary for the user’s question
+        parts = vector_store.sentence_parts(list(chunk_ids)) if vector_store is not None else None
+        summary = summarize_for_query(context_text, query, max_sentences=6, parts=parts or None)
+
+        return (
+            "I'm temporarily unable to use the language model service "
+            "(likely due to API limits), so here's a concise answer "
+            "built directly from your uploaded NeoConsult document.\n\n"
+            f"**What the document says about _\"{query}\"_:**\n\n"
+            f"{summary}\n\n"
+            "_This summary is extracted from the brochure; you can ask more "
+            "follow-up questions or start a booking if you'd like._"
+        )
+    return (
+        "I'm currently unable to use the language model and I "
+        "also couldn't find relevant information in the uploaded PDFs."
+    )
 
 
 # 1. RAG Tool
-def rag_tool(query: str, vector_store, chat_history):
+@traced("rag_tool")
+def rag_tool(
+    query: str,
+    vector_store,
+    chat_history,
+    stream: bool = False,
+    retrieval_mode: str | None = None,
+    llm_client=None,
+    answer_cache=None,
+):
     """
     Input: query
     Output: answer using retrieved chunks + chat history + LLM.
+    With stream=True the answer is returned as a generator of text pieces.
+    `retrieval_mode` overrides RETRIEVAL_MODE ("dense", "sparse", "hybrid").
+    `llm_client` replaces the OpenAI client (e.g. a stub in benchmarks)
+    and `answer_cache` the shared get_answer_cache().
 
     Behaviour:
-    - First tries to call the OpenAI chat model (normal RAG).
-    - If the API fails (quota, bad key, etc.), falls back to a
-      conversational answer built directly from the retrieved chunks.
+    - Returns a cached answer when the same question was answered from
+      the same retrieved chunks (see app/answer_cache.py).
+    - Otherwise tries to call the OpenAI chat model (normal RAG).
+    - If the API fails (quota, bad key, etc.) or returns an empty answer,
+      falls back to a conversational answer built directly from the
+      retrieved chunks. Fallback answers are not cached.
     """
-    context_pairs = vector_store.similarity_search(query, k=4) if vector_store else []
-    context_text = "\n\n".join([c[0] for c in context_pairs])
-
-    history_text = "\n".join(
-        [f"{m['role']}: {m['content']}" for m in chat_history[-20:]]
+    hits = vector_store.similarity_search_with_ids(query, k=RAG_TOP_K, mode=retrieval_mode) if vector_store else []
+    # Token-budgeted context: deduplicated chunks and trimmed history
+    with span("build_context") as sp:
+        chunks, history_text, report = build_context(query, hits, chat_history)
+        sp.set(
+            tokens_before=report.tokens_before,
+            tokens_after=report.tokens_after,
+            chunks_in=report.chunks_in,
+            chunks_used=report.chunks_used,
+            chunks_dropped=report.chunks_in - report.chunks_used,
+            duplicates_removed=report.duplicates_removed,
+            history_summarized=report.history_summarized,
+        )
+    context_text = "\n\n".join([text for _, text in chunks])
+    # The LLM also sees each chunk's source page so it can cite it
+    sources = [vector_store.source(cid) for cid, _ in chunks] if vector_store else []
+    cited_context = "\n\n".join(
+        f"[page {src[1]}] {text}" if src and src[1] else text
+        for src, (_, text) in zip(sources, chunks)
     )
 
+    cache = answer_cache if answer_cache is not None else get_answer_cache()
+    corpus = vector_store.corpus_id if vector_store else ""
+    cache_key = answer_cache_key(LLM_MODEL, LLM_TEMPERATURE, query, [cid for cid, _ in chunks])
+    cached = cache.get(corpus, cache_key)
+    if cached is not None:
+        return iter([cached]) if stream else cached
+
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
         {
             "role": "user",
             "content": (
                 f"Conversation so far:\n{history_text}\n\n"
-                f"Context from uploaded PDFs:\n{context_text}\n\n"
+                f"Context from uploaded PDFs:\n{cited_context}\n\n"
                 f"User question: {query}"
             ),
         },
     ]
 
+    chunk_ids = [cid for cid, _ in chunks]
+    if stream:
+        return _stream_answer(
+            messages, query, context_text, cache, corpus, cache_key, vector_store, chunk_ids, llm_client
+        )
+
     # --- First try: normal LLM call ---
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.2,
-        )
-        return resp.choices[0].message.content
+        with span("llm.completion", model=LLM_MODEL):
+            resp = (llm_client or get_llm_client()).chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=LLM_TEMPERATURE,
+            )
+        answer = resp.choices[0].message.content
+        if not answer:
+            raise ValueError("empty completion")
+        cache.put(corpus, cache_key, answer)
+        return answer
 
     # --- Fallback: no LLM, just retrieved text in a nice format ---
     except Exception:
-        if context_text.strip():
-            # Build a focused summary for the user’s question
-            summary = summarize_for_query(context_text, query, max_sentences=6)
-
-            return (
-                "I'm temporarily unable to use the language model service "
-                "(likely due to API limits), so here's a concise answer "
-                "built directly from your uploaded NeoConsult document.\n\n"
-                f"**What the document says about _\"{query}\"_:**\n\n"
-                f"{summary}\n\n"
-                "_This summary is extracted from the brochure; you can ask more "
-                "follow-up questions or start a booking if you'd like._"
-            )
-        else:
-            return (
-                "I'm currently unable to use the language model and I "
-                "also couldn't find relevant information in the uploaded PDFs."
-            )
+        return fallback_answer(query, context_text, vector_store, chunk_ids)
+
+
+def _stream_answer(
+    messages, query, context_text, cache, corpus, cache_key, vector_store=None, chunk_ids=(), llm_client=None
+):
+    """
+    Yield completion tokens as they arrive. If the stream fails, yield the
+    extractive fallback instead (after a separator when tokens were
+    already sent); an empty stream also gets the fallback. Only complete,
+    non-empty answers are cached.
+
+    The stream is consumed after rag_tool returned, so its timings are
+    recorded as separate "llm.first_token" and "llm.stream" spans.
+    """
+    parts = []
+    start = time.perf_counter()
+    try:
+        events = (llm_client or get_llm_client()).chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            temperature=LLM_TEMPERATURE,
+            stream=True,
+        )
+        for event in events:
+            delta = event.choices[0].delta.content if event.choices else None
+            if delta:
+                if not parts:
+                    record("llm.first_token", (time.perf_counter() - start) * 1000.0, model=LLM_MODEL)
+                parts.append(delta)
+                yield delta
+    except Exception as e:
+        record("llm.stream", (time.perf_counter() - start) * 1000.0, type(e).__name__, model=LLM_MODEL)
+        if parts:
+            yield "\n\n---\n\n_The answer was interrupted._ "
+        yield fallback_answer(query, context_text, vector_store, chunk_ids)
+        return
+    record("llm.stream", (time.perf_counter() - start) * 1000.0, model=LLM_MODEL, pieces=len(parts))
+    if parts:
+        cache.put(corpus, cache_key, "".join(parts))
+    else:
+        yield fallback_answer(query, context_text, vector_store, chunk_ids)
 
 
 # 2. Booking Persistence Tool
-def booking_persistence_tool(db, booking_payload: dict):
+@traced("booking_persistence_tool")
+def booking_persistence_tool(
+    db,
+    booking_payload: dict,
+    idempotency_key: str | None = None,
+    confirmation_email: dict | None = None,
+    mailer=None,
+):
     """
-    Input: structured booking payload.
-    Output: dict with success flag, booking_id, error.
+    Input: structured booking payload, optional client idempotency key and
+    confirmation email ({"subject", "body"}) to queue with the booking.
+    `mailer` is the outbox sender to wake (default: get_outbox_sender()).
+    Output: dict with success flag, booking_id, customer_id, created, error.
+
+    Customer upsert, booking insert and email enqueue share one
+    transaction; a retried confirm with the same key returns the
+    existing booking (created=False).
     """
     try:
         if not is_valid_email(booking_payload["email"]):
@@ -135,44 +251,82 @@ def booking_persistence_tool(db, booking_payload: dict):
                 "booking_id": None,
                 "error": "Invalid email address.",
             }
+        # Capacity is counted per slot start, so off-grid times are refused
+        if not is_slot_time(booking_payload["time"]):
+            return {
+                "success": False,
+                "booking_id": None,
+                "error": f"{booking_payload['time']:%H:%M} is not a bookable time. {slot_rules()}",
+            }
 
-        customer = get_or_create_customer(
+        booking_id, customer_id, created = create_booking_with_customer(
             db=db,
             name=booking_payload["name"],
             email=booking_payload["email"],
             phone=booking_payload["phone"],
             company=booking_payload.get("company"),
-        )
-
-        booking = create_booking(
-            db=db,
-            customer=customer,
             booking_type=booking_payload["booking_type"],
             date_obj=booking_payload["date"],
             time_obj=booking_payload["time"],
+            idempotency_key=idempotency_key,
+            confirmation_email=confirmation_email,
+            slot_capacity=SLOT_CAPACITY,
         )
-
-        return {"success": True, "booking_id": booking.id, "error": None}
+    except SlotUnavailableError as e:
+        return {"success": False, "booking_id": None, "error": str(e), "slot_taken": True}
     except Exception as e:
+        db.rollback()
         return {"success": False, "booking_id": None, "error": str(e)}
 
+    # The booking is committed from here on; a sender that cannot be woken
+    # only delays the email until its next poll
+    if created and confirmation_email:
+        try:
+            (mailer or get_outbox_sender()).wake()
+        except Exception:
+            pass
+
+    return {
+        "success": True,
+        "booking_id": booking_id,
+        "customer_id": customer_id,
+        "created": created,
+        "error": None,
+    }
+
+
+def slot_availability_tool(db, date_obj, time_obj):
+    """
+    Check whether a date/time slot still has a free place.
+    Output: {'available': bool, 'suggestions': [(date, time), ...]}
+    Times off the slot grid (see booking_flow.slot_times) are never
+    available. Suggestions are only computed when the slot is unavailable.
+    """
+    free_places = get_slot_usage(db, date_obj, date_obj + timedelta(days=SLOT_SEARCH_DAYS - 1), SLOT_CAPACITY)
+    if is_slot_time(time_obj) and free_places.get((date_obj, time_obj), SLOT_CAPACITY) > 0:
+        return {"available": True, "suggestions": []}
+    return {
+        "available": False,
+        "suggestions": suggest_free_slots(free_places, date_obj, time_obj, SLOT_SEARCH_DAYS),
+    }
+
 
 # 3. Email Tool
-def email_tool(to_email: str, subject: str, body: str):
+@traced("email_tool")
+def email_tool(to_email: str, subject: str, body: str, smtp_settings: dict | None = None):
     """
-    Sends an email via SMTP.
+    Sends an email via SMTP right away (blocking).
+    `smtp_settings` ({"host", "port", "user", "password"}) default to
+    load_smtp_settings() (environment or Streamlit secrets).
     Output: {'success': bool, 'error': str | None}
     """
     try:
-        msg = MIMEMultipart()
-        msg["From"] = st.secrets["EMAIL_USER"]
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
+        s = smtp_settings or load_smtp_settings()
+        msg = build_message(s["user"], to_email, subject, body)
 
-        with smtplib.SMTP(st.secrets["EMAIL_HOST"], int(st.secrets["EMAIL_PORT"])) as server:
+        with smtplib.SMTP(s["host"], int(s["port"])) as server:
             server.starttls()
-            server.login(st.secrets["EMAIL_USER"], st.secrets["EMAIL_PASSWORD"])
+            server.login(s["user"], s["password"])
             server.send_message(msg)
 
         return {"success": True, "error": None}
@@ -180,6 +334,22 @@ def email_tool(to_email: str, subject: str, body: str):
         return {"success": False, "error": str(e)}
 
 
+def queue_email_tool(db, to_email: str, subject: str, body: str, booking_id: int | None = None, mailer=None):
+    """
+    Adds an email to the outbox and wakes the background sender (`mailer`,
+    default get_outbox_sender()); delivery status is recorded on the
+    outbox row and the booking.
+    Output: {'success': bool, 'error': str | None}
+    """
+    try:
+        enqueue_email(db, to_email, subject, body, booking_id=booking_id)
+        (mailer or get_outbox_sender()).wake()
+        return {"success": True, "error": None}
+    except Exception as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+
+
 # 4. Booking Lookup Tool (bonus)
 def booking_lookup_tool(db, email: str):
     """
@@ -0,0 +1,113 @@
+"""Shared helpers for the benchmark scripts: timers, stubs and JSON output."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Count, mean and p50/p95/p99/max of latency samples in milliseconds."""
+    if not samples_ms:
+        return {"n": 0}
+    arr = np.asarray(samples_ms, dtype=float)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "n": int(len(arr)),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+
+
+def time_call(fn: Callable, *args, **kwargs):
+    """(result, elapsed milliseconds) of one call."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def repeat(fn: Callable, n: int) -> Dict[str, float]:
+    """Call `fn()` n times and summarize the latencies."""
+    return summarize([time_call(fn)[1] for _ in range(n)])
+
+
+class StubLLMClient:
+    """
+    Stand-in for openai.OpenAI's chat.completions.create: waits
+    `latency_ms` (time to first token), then returns a canned answer,
+    streamed in `tokens` pieces `token_ms` apart when stream=True.
+    With fail=True every call raises, exercising the extractive fallback.
+    """
+
+    def __init__(self, latency_ms: float = 300.0, tokens: int = 60, token_ms: float = 0.0, fail: bool = False):
+        self.latency_ms = latency_ms
+        self.tokens = tokens
+        self.token_ms = token_ms
+        self.fail = fail
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, temperature=None, stream=False, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("stub LLM unavailable")
+        time.sleep(self.latency_ms / 1000.0)
+        words = [f"word{i} " for i in range(self.tokens)]
+        if stream:
+            return self._stream(words)
+        message = SimpleNamespace(content="".join(words))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream(self, words):
+        for word in words:
+            if self.token_ms:
+                time.sleep(self.token_ms / 1000.0)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(settings: dict) -> dict:
+    """Environment and settings recorded with every result file."""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": settings,
+    }
+
+
+def write_results(path: str, results: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(results, fh, indent=2, default=str)
+    print(f"results written to {path}")
+
+
+def compare(current: dict, baseline: dict, key: str = "p50_ms", prefix: str = ""):
+    """Print current/baseline ratios for every timing present in both result trees."""
+    for name, value in current.items():
+        base = baseline.get(name) if isinstance(baseline, dict) else None
+        if base is None:
+            continue
+        if isinstance(value, dict) and key in value and key in base and base[key]:
+            print(f"{prefix}{name}: {value[key]:.2f} ms vs {base[key]:.2f} ms ({value[key] / base[key]:.2f}x)")
+        elif isinstance(value, dict):
+            compare(value, base, key, f"{prefix}{name}.")
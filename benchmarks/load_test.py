@@ -0,0 +1,330 @@
+"""
+Booking-path and database load test.
+
+    python -m benchmarks.load_test [--sessions 20] [--bookings 10] [--days 365]
+        [--llm-latency-ms 50] [--smtp-latency-ms 20]
+        [--admin-sizes 10000,100000,1000000] [--db PATH]
+        [--out benchmarks/results/load.json] [--baseline previous.json]
+
+Drives `--sessions` simulated chat sessions concurrently (one thread
+each) through app.engine.ChatEngine. Each session asks one
+question (RAG path, no PDF) and then books `--bookings` consultations
+through the chat state machine. Sessions pick random slots over `--days`
+days and retry when a slot is full or taken. The database is a temporary
+SQLite file, selected through NEOCONSULT_DB_URL before any db module is
+imported. The LLM and SMTP server are stubs, and the outbox sender
+treats every domain as deliverable so no DNS lookups happen.
+
+Reported:
+- bookings/sec and per-turn latency percentiles
+- time in write statements, measured with SQLAlchemy cursor events.
+  SQLite busy waits on the write lock happen inside those statements, so
+  lock wait is estimated as write time above the uncontended median
+  measured in a single-session calibration run.
+- admin query_bookings timings after the bookings table is bulk-grown to
+  each `--admin-sizes` row count
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import StubLLMClient, compare, run_metadata, summarize, time_call, write_results
+
+DEFAULT_OUT = os.path.join("benchmarks", "results", "load.json")
+SEED = 4321
+MAX_SLOT_ATTEMPTS = 8
+ADMIN_REPEATS = 20
+WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class StubSMTP:
+    """Minimal smtplib.SMTP stand-in that sleeps `latency_ms` per message."""
+
+    latency_ms = 20.0
+    sent = 0
+    _lock = threading.Lock()
+
+    def __init__(self, host, port=0, timeout=None):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, msg):
+        time.sleep(self.latency_ms / 1000.0)
+        with StubSMTP._lock:
+            StubSMTP.sent += 1
+
+    def quit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class StatementTimer:
+    """Per-statement execute times from SQLAlchemy cursor events, split into reads and writes."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self._lock = threading.Lock()
+        self.samples = {"read": [], "write": []}
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("bench_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = (time.perf_counter() - conn.info["bench_start"].pop()) * 1000.0
+        kind = "write" if statement.lstrip().split(None, 1)[0].upper() in WRITE_VERBS else "read"
+        with self._lock:
+            self.samples[kind].append(elapsed)
+
+    def reset(self):
+        with self._lock:
+            self.samples = {"read": [], "write": []}
+
+
+def simulate_session(session_id: int, bookings: int, days: int, chat_engine, rng: random.Random, record) -> dict:
+    """One user: a question, then `bookings` bookings through the chat flow."""
+    from app.config import SLOT_DAY_END_HOUR, SLOT_DAY_START_HOUR, SLOT_MINUTES
+
+    slots_per_day = (SLOT_DAY_END_HOUR - SLOT_DAY_START_HOUR) * 60 // SLOT_MINUTES
+    session = chat_engine.new_session()
+    outcome = {"confirmed": 0, "failed": 0, "gave_up": 0, "slot_retries": 0, "errors": []}
+
+    def turn(label, message):
+        reply, ms = time_call(chat_engine.handle, session, message)
+        if not isinstance(reply, str):
+            start = time.perf_counter()
+            reply = "".join(reply)
+            ms += (time.perf_counter() - start) * 1000.0
+        record(label, ms)
+        return reply
+
+    turn("question", f"What services do you offer for project {session_id}?")
+    for b in range(bookings):
+        turn("start", "I want to book a consultation")
+        turn("name", f"Load User {session_id}-{b}")
+        turn("company", f"Company {session_id}")
+        turn("email", f"load.user{session_id}.{b}@example.com")
+        turn("phone", f"+1555{session_id:04d}{b:03d}")
+        turn("booking_type", "Data Platform")
+        day = date.today() + timedelta(days=rng.randint(1, days))
+        turn("date", day.isoformat())
+        for _ in range(MAX_SLOT_ATTEMPTS):
+            minutes = SLOT_DAY_START_HOUR * 60 + rng.randrange(slots_per_day) * SLOT_MINUTES
+            reply = turn("time", f"{minutes // 60:02d}:{minutes % 60:02d}")
+            if "fully booked" in reply:
+                outcome["slot_retries"] += 1
+                continue
+            reply = turn("confirm", "yes")
+            if "Booking confirmed" in reply:
+                outcome["confirmed"] += 1
+                break
+            if reply.startswith("Booking failed"):
+                outcome["failed"] += 1
+                outcome["errors"].append(reply)
+                turn("cancel", "no")
+                break
+            outcome["slot_retries"] += 1  # taken between check and confirm
+        else:
+            outcome["gave_up"] += 1
+            turn("cancel", "cancel")
+    return outcome
+
+
+def run_load(sessions: int, bookings: int, days: int, chat_engine, timer) -> dict:
+    turns = {}
+    lock = threading.Lock()
+
+    def record(label, ms):
+        with lock:
+            turns.setdefault(label, []).append(ms)
+
+    timer.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [
+            pool.submit(simulate_session, i, bookings, days, chat_engine, random.Random(SEED + i), record)
+            for i in range(sessions)
+        ]
+        outcomes = [f.result() for f in futures]
+    wall = time.perf_counter() - start
+
+    confirmed = sum(o["confirmed"] for o in outcomes)
+    return {
+        "sessions": sessions,
+        "bookings_per_session": bookings,
+        "wall_s": round(wall, 3),
+        "confirmed": confirmed,
+        "failed": sum(o["failed"] for o in outcomes),
+        "gave_up": sum(o["gave_up"] for o in outcomes),
+        "slot_retries": sum(o["slot_retries"] for o in outcomes),
+        "errors": sorted({e for o in outcomes for e in o["errors"]})[:10],
+        "bookings_per_sec": round(confirmed / wall, 3) if wall else 0.0,
+        "turns": {label: summarize(samples) for label, samples in sorted(turns.items())},
+        "write_statements": summarize(timer.samples["write"]),
+        "read_statements": summarize(timer.samples["read"]),
+        "_writes": list(timer.samples["write"]),
+    }
+
+
+def grow_bookings(engine, target: int, batch: int = 50000):
+    """Bulk-insert synthetic customers and bookings until `target` booking rows exist."""
+    from sqlalchemy import func, select
+    from db.models import Booking, Customer
+
+    with engine.begin() as conn:
+        have = conn.execute(select(func.count()).select_from(Booking)).scalar_one()
+        next_customer = (conn.execute(select(func.max(Customer.customer_id))).scalar() or 0) + 1
+    rng = random.Random(SEED + target)
+    created = datetime(2020, 1, 1) + timedelta(minutes=have)
+    while have < target:
+        n = min(batch, target - have)
+        n_customers = max(n // 10, 1)
+        customers = [
+            {
+                "customer_id": next_customer + i,
+                "name": f"Bulk User {next_customer + i}",
+                "email": f"bulk{next_customer + i}@example.com",
+                "phone": f"+1666{next_customer + i:07d}",
+                "company": f"Bulk Co {(next_customer + i) % 1000}",
+            }
+            for i in range(n_customers)
+        ]
+        bookings = []
+        for i in range(n):
+            created += timedelta(minutes=1)
+            bookings.append({
+                "customer_id": next_customer + rng.randrange(n_customers),
+                "booking_type": rng.choice(["Data Platform", "BI Dashboards", "GenAI POC", "Predictive Analytics"]),
+                "date": date(2021, 1, 1) + timedelta(days=rng.randrange(1500)),
+                "time": datetime(2000, 1, 1, rng.randrange(9, 18), rng.choice([0, 30])).time(),
+                "status": "CONFIRMED",
+                "created_at": created,
+                "email_status": "SENT",
+            })
+        with engine.begin() as conn:
+            conn.execute(Customer.__table__.insert(), customers)
+            conn.execute(Booking.__table__.insert(), bookings)
+        next_customer += n_customers
+        have += n
+
+
+def time_admin_queries(session_factory) -> dict:
+    """query_bookings timings for the dashboard's first page, deep paging and each filter."""
+    from db.database import query_bookings
+
+    db = session_factory()
+    try:
+        cursor = None
+        for _ in range(9):
+            _, cursor = query_bookings(db, after=cursor)
+        probe_date = date(2021, 1, 1) + timedelta(days=700)
+        cases = {
+            "first_page": lambda: query_bookings(db),
+            "page_10": lambda: query_bookings(db, after=cursor),
+            "name_filter": lambda: query_bookings(db, name="User 12"),
+            "email_filter": lambda: query_bookings(db, email="bulk77"),
+            "date_filter": lambda: query_bookings(db, date=probe_date),
+        }
+        return {name: summarize([time_call(fn)[1] for _ in range(ADMIN_REPEATS)]) for name, fn in cases.items()}
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--bookings", type=int, default=10, help="bookings per session")
+    parser.add_argument("--days", type=int, default=365, help="bookings are spread over this many days")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--smtp-latency-ms", type=float, default=20.0)
+    parser.add_argument("--admin-sizes", default="10000,100000,1000000")
+    parser.add_argument("--db", help="SQLite file to use (default: a new temporary file)")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="neoconsult-load-"), "bookings.db")
+    # Must be set before db.session is imported: the engine is created at import
+    os.environ["NEOCONSULT_DB_URL"] = f"sqlite:///{db_path}"
+
+    import app.outbox as outbox
+    from app.engine import ChatEngine
+    from db.database import init_db
+    from db.session import SQLITE_PRAGMAS, SessionLocal, engine
+
+    init_db()
+    StubSMTP.latency_ms = args.smtp_latency_ms
+    outbox.smtplib.SMTP = StubSMTP
+    outbox.is_deliverable_email = lambda email: True
+    sender = outbox.OutboxSender(
+        {"host": "stub", "port": 25, "user": "bookings@neoconsult.test", "password": ""}, SessionLocal
+    ).start()
+
+    chat_engine = ChatEngine(llm_client=StubLLMClient(args.llm_latency_ms), mailer=sender)
+    timer = StatementTimer(engine)
+
+    print("calibrating (1 session) ...")
+    calibration = run_load(1, 5, args.days, chat_engine, timer)
+    base_write = calibration["write_statements"].get("p50_ms", 0.0)
+
+    print(f"load: {args.sessions} sessions x {args.bookings} bookings ...")
+    load = run_load(args.sessions, args.bookings, args.days, chat_engine, timer)
+    writes = load.pop("_writes")
+    calibration.pop("_writes")
+    lock_wait = sum(max(0.0, w - base_write) for w in writes)
+    load["lock_wait_ms_total"] = round(lock_wait, 3)
+    load["lock_wait_ms_per_booking"] = round(lock_wait / load["confirmed"], 3) if load["confirmed"] else None
+
+    # Let the outbox drain before measuring admin queries
+    deadline = time.monotonic() + 30
+    while StubSMTP.sent < calibration["confirmed"] + load["confirmed"] and time.monotonic() < deadline:
+        time.sleep(0.1)
+    sender.stop()
+    load["emails_sent"] = StubSMTP.sent
+
+    admin = {}
+    for size in [int(s) for s in args.admin_sizes.split(",") if s]:
+        print(f"admin queries at {size} bookings ...")
+        grow_bookings(engine, size)
+        admin[str(size)] = time_admin_queries(SessionLocal)
+
+    results = {
+        "meta": run_metadata({
+            "sessions": args.sessions,
+            "bookings": args.bookings,
+            "days": args.days,
+            "llm_latency_ms": args.llm_latency_ms,
+            "smtp_latency_ms": args.smtp_latency_ms,
+            "db_path": db_path,
+            "sqlite_pragmas": SQLITE_PRAGMAS,
+        }),
+        "calibration": calibration,
+        "load": load,
+        "admin": admin,
+    }
+    write_results(args.out, results)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            compare(results, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Retrieval and answer-latency benchmarks for the RAG path.
+
+    python -m benchmarks.rag_bench [--scales 1,10,100,1000] [--queries 200]
+        [--rag-queries 20] [--llm-latency-ms 300] [--token-ms 0]
+        [--out benchmarks/results/rag.json] [--baseline previous.json]
+
+Corpus scale 1 is the text of docs/neoconsult_services.pdf; scale N is N
+copies of its pages with sentences shuffled per copy (fixed seed), so
+chunks are not exact duplicates. For every scale it times chunk_text,
+embedding, SimpleVectorStore.build_index, the BM25 build,
+similarity_search per retrieval mode, summarize_for_query and rag_tool end
+to end against a stub LLM client, and writes the results as JSON. With
+--baseline, p50 ratios against an earlier result file are printed.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import re
+
+from PyPDF2 import PdfReader
+
+from app.config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    RAG_EMBED_MODEL,
+    RAG_TOP_K,
+    RETRIEVAL_MODE,
+    VECTOR_INDEX_MODE,
+)
+from app.rag_pipeline import SimpleVectorStore, chunk_text, embed_chunks, extract_text_from_pdf
+from app.tools import rag_tool, summarize_for_query
+from benchmarks.common import (
+    StubLLMClient,
+    compare,
+    repeat,
+    run_metadata,
+    summarize,
+    time_call,
+    write_results,
+)
+
+PDF_PATH = os.path.join("docs", "neoconsult_services.pdf")
+DEFAULT_OUT = os.path.join("benchmarks", "results", "rag.json")
+SEED = 1234
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[A-Za-z]{4,}")
+
+HISTORY = [
+    {"role": "user" if i % 2 == 0 else "assistant", "content": f"Earlier message {i} about data projects."}
+    for i in range(10)
+]
+
+
+def synthetic_corpus(pages, scale: int, rng: random.Random) -> str:
+    """`scale` copies of the pages, sentences shuffled within each page copy."""
+    parts = []
+    for copy in range(scale):
+        for page in pages:
+            sentences = _SENTENCE_SPLIT.split(page)
+            if copy:
+                rng.shuffle(sentences)
+            parts.append(" ".join(sentences))
+    return "\n".join(parts)
+
+
+def make_queries(text: str, n: int, rng: random.Random):
+    """n distinct questions built from corpus words, so no query hits a cache."""
+    vocab = sorted({w.lower() for w in _WORD.findall(text)})
+    templates = [
+        "What does NeoConsult offer for {}?",
+        "How do you handle {} and {}?",
+        "Tell me about {} {} services",
+        "{} pricing",
+    ]
+    queries = set()
+    while len(queries) < n:
+        template = rng.choice(templates)
+        queries.add(template.format(*rng.sample(vocab, template.count("{}"))))
+    return sorted(queries)
+
+
+def bench_scale(pages, scale: int, args, rng: random.Random) -> dict:
+    text = synthetic_corpus(pages, scale, rng)
+    result = {"chars": len(text)}
+
+    result["chunk_text"] = repeat(lambda: chunk_text(text), 3)
+    chunks = chunk_text(text)
+    result["chunks"] = len(chunks)
+
+    embeddings, ms = time_call(embed_chunks, chunks)
+    result["embed_chunks"] = summarize([ms])
+
+    store = SimpleVectorStore()
+    result["build_index"] = repeat(lambda: store.build_index(chunks, embeddings), 3)
+    result["index_mode"] = store.index_mode
+
+    def build_bm25():
+        store.bm25 = None  # built lazily by the first sparse/hybrid query
+        return store.bm25_index()
+
+    result["build_bm25"] = repeat(build_bm25, 3)
+    result["bm25_bytes"] = store.bm25.nbytes
+
+    queries = make_queries(text, args.queries * 4 + args.rag_queries * 3, rng)
+    search = {}
+    for i, mode in enumerate(("dense", "sparse", "hybrid")):
+        batch = queries[i * args.queries:(i + 1) * args.queries]
+        search[mode] = summarize([time_call(store.similarity_search, q, RAG_TOP_K, mode)[1] for q in batch])
+    warm = queries[:args.queries]
+    search["dense_cached"] = summarize([time_call(store.similarity_search, q, RAG_TOP_K, "dense")[1] for q in warm])
+    result["similarity_search"] = search
+
+    contexts = []
+    for q in queries[3 * args.queries:4 * args.queries]:
+        hits = store.similarity_search_with_ids(q, RAG_TOP_K)
+        ids = [cid for cid, _, _ in hits]
+        contexts.append((q, "\n\n".join(c for _, c, _ in hits), ids))
+    result["summarize_for_query"] = {
+        "text": summarize([time_call(summarize_for_query, c, q)[1] for q, c, _ in contexts]),
+        "sentence_index": summarize([
+            time_call(summarize_for_query, c, q, 6, store.sentence_parts(ids) or None)[1]
+            for q, c, ids in contexts
+        ]),
+    }
+
+    rag_queries = queries[4 * args.queries:]
+    client = StubLLMClient(args.llm_latency_ms, token_ms=args.token_ms)
+    failing = StubLLMClient(fail=True)
+    n = args.rag_queries
+    rag = {
+        "answer": summarize([
+            time_call(rag_tool, q, store, HISTORY, llm_client=client)[1] for q in rag_queries[:n]
+        ]),
+        "fallback": summarize([
+            time_call(rag_tool, q, store, HISTORY, llm_client=failing)[1] for q in rag_queries[n:2 * n]
+        ]),
+    }
+    first, total = [], []
+    for q in rag_queries[2 * n:3 * n]:
+        stream, ms = time_call(rag_tool, q, store, HISTORY, stream=True, llm_client=client)
+        _, first_ms = time_call(next, stream)
+        _, rest_ms = time_call(lambda: [piece for piece in stream])
+        first.append(ms + first_ms)
+        total.append(ms + first_ms + rest_ms)
+    rag["stream_first_token"] = summarize(first)
+    rag["stream_total"] = summarize(total)
+    result["rag_tool"] = rag
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1,10,100,1000")
+    parser.add_argument("--queries", type=int, default=200, help="queries per search mode")
+    parser.add_argument("--rag-queries", type=int, default=20, help="rag_tool calls per variant")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=0.0, help="delay between streamed tokens")
+    parser.add_argument("--pdf", default=PDF_PATH)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as fh:
+        data = fh.read()
+    pages = [page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages]
+
+    scales = [int(s) for s in args.scales.split(",") if s]
+    results = {
+        "meta": run_metadata({
+            "scales": scales,
+            "queries": args.queries,
+            "rag_queries": args.rag_queries,
+            "llm_latency_ms": args.llm_latency_ms,
+            "token_ms": args.token_ms,
+            "embed_model": RAG_EMBED_MODEL,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "top_k": RAG_TOP_K,
+            "retrieval_mode": RETRIEVAL_MODE,
+            "vector_index_mode": VECTOR_INDEX_MODE,
+        }),
+        "extract_text_from_pdf": repeat(lambda: extract_text_from_pdf(io.BytesIO(data)), 20),
+        "scales": {},
+    }
+    rng = random.Random(SEED)
+    for scale in scales:
+        print(f"scale {scale}x ...")
+        results["scales"][str(scale)] = bench_scale(pages, scale, args, rng)
+
+    write_results(args.out, results)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            compare(results, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
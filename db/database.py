@@ -1,27 +1,57 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from .models import Base, Customer, Booking
+import threading
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, update, and_, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager
+from .models import Base, Customer, Booking, BookingSlot, EmailOutbox
+from .migrations import migrate
+from .session import engine, SessionLocal, session_scope
+from utils.tracing import traced
 
-DB_URL = "sqlite:///bookings.db"
 
-engine = create_engine(DB_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine)
+class SlotUnavailableError(Exception):
+    """The requested date/time slot has no free places left."""
+
+
+_db_ready = False
+_db_lock = threading.Lock()
 
 
 def init_db():
-    """Create tables if they don't exist."""
-    Base.metadata.create_all(engine)
+    """
+    Create tables if they don't exist and apply pending migrations. Runs
+    once per process; later calls (every Streamlit rerun) return at once.
+    """
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_lock:
+        if not _db_ready:
+            migrate(engine, Base.metadata)
+            _db_ready = True
+
+
+def customer_by_email_query(email: str):
+    """Statement behind get_or_create_customer's lookup."""
+    return select(Customer).where(Customer.email == email).limit(1)
 
 
 def get_or_create_customer(db, name: str, email: str, phone: str, company: str | None = None):
     """Find customer by email or create one."""
-    customer = db.query(Customer).filter_by(email=email).first()
+    customer = db.scalars(customer_by_email_query(email)).first()
     if customer:
         return customer
 
     customer = Customer(name=name, email=email, phone=phone, company=company)
     db.add(customer)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another session created the same email first
+        db.rollback()
+        return db.scalars(customer_by_email_query(email)).one()
     db.refresh(customer)
     return customer
 
@@ -40,22 +70,265 @@ def create_booking(db, customer, booking_type, date_obj, time_obj):
     return booking
 
 
+def _booking_for_key(db, idempotency_key: str | None):
+    if not idempotency_key:
+        return None
+    return db.execute(
+        select(Booking.id, Booking.customer_id).where(Booking.idempotency_key == idempotency_key)
+    ).first()
+
+
+@traced("db.create_booking_with_customer")
+def create_booking_with_customer(
+    db,
+    name: str,
+    email: str,
+    phone: str,
+    company: str | None,
+    booking_type: str,
+    date_obj,
+    time_obj,
+    idempotency_key: str | None = None,
+    confirmation_email: dict | None = None,
+    slot_capacity: int | None = None,
+):
+    """
+    Upsert the customer, insert the booking and (optionally) queue its
+    confirmation email ({"subject", "body"}) in a single transaction.
+    With slot_capacity set, the date/time slot is reserved in the same
+    transaction and SlotUnavailableError is raised when it is full.
+
+    A retry with an idempotency_key that was already used returns the
+    existing booking instead of creating a duplicate.
+    Returns (booking_id, customer_id, created).
+    """
+    existing = _booking_for_key(db, idempotency_key)
+    if existing:
+        return existing.id, existing.customer_id, False
+
+    try:
+        if slot_capacity is not None and not reserve_slot(db, date_obj, time_obj, slot_capacity):
+            db.rollback()
+            # A concurrent retry with the same key may have taken the slot
+            existing = _booking_for_key(db, idempotency_key)
+            if existing:
+                return existing.id, existing.customer_id, False
+            raise SlotUnavailableError(f"{date_obj:%Y-%m-%d} at {time_obj:%H:%M} is fully booked.")
+        # Existing customers keep their stored details, as in get_or_create_customer
+        customer_id = db.execute(
+            sqlite_insert(Customer)
+            .values(name=name, email=email, phone=phone, company=company)
+            .on_conflict_do_update(index_elements=[Customer.email], set_={"email": email})
+            .returning(Customer.customer_id)
+        ).scalar_one()
+        booking_id = db.execute(
+            insert(Booking)
+            .values(
+                customer_id=customer_id,
+                booking_type=booking_type,
+                date=date_obj,
+                time=time_obj,
+                idempotency_key=idempotency_key,
+                email_status="QUEUED" if confirmation_email else None,
+            )
+            .returning(Booking.id)
+        ).scalar_one()
+        if confirmation_email:
+            db.execute(
+                insert(EmailOutbox).values(
+                    booking_id=booking_id,
+                    to_email=email,
+                    subject=confirmation_email["subject"],
+                    body=confirmation_email["body"],
+                )
+            )
+        db.commit()
+    except IntegrityError:
+        # A concurrent retry with the same key committed first
+        db.rollback()
+        existing = _booking_for_key(db, idempotency_key)
+        if not existing:
+            raise
+        return existing.id, existing.customer_id, False
+    return booking_id, customer_id, True
+
+
+@traced("db.reserve_slot")
+def reserve_slot(db, date_obj, time_obj, capacity: int) -> bool:
+    """
+    Take one place in a slot with a single upsert that only succeeds while
+    booked < capacity. `capacity` is the current setting, not the one the
+    slot was first written with, so raising it reopens full slots; the
+    stored capacity is updated with the reservation. Returns False when the
+    slot is full. Does not commit; the reservation belongs to the caller's
+    transaction.
+    """
+    stmt = sqlite_insert(BookingSlot).values(date=date_obj, time=time_obj, booked=1, capacity=capacity)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BookingSlot.date, BookingSlot.time],
+        set_={"booked": BookingSlot.booked + 1, "capacity": stmt.excluded.capacity},
+        where=BookingSlot.booked < stmt.excluded.capacity,
+    )
+    return db.execute(stmt).rowcount == 1
+
+
+@traced("db.get_slot_usage")
+def get_slot_usage(db, start_date, end_date, capacity: int | None = None) -> dict:
+    """
+    {(date, time): free places} for slots with reservations between
+    start_date and end_date (inclusive). Slots not returned are empty.
+    Free places are counted against `capacity` when given (the current
+    setting), else against each slot's stored capacity.
+    One primary-key range scan on booking_slots.
+    """
+    rows = db.execute(
+        select(BookingSlot.date, BookingSlot.time, BookingSlot.booked, BookingSlot.capacity)
+        .where(BookingSlot.date >= start_date, BookingSlot.date <= end_date)
+    ).all()
+    return {(r.date, r.time): (r.capacity if capacity is None else capacity) - r.booked for r in rows}
+
+
+@traced("db.get_all_bookings")
 def get_all_bookings(db):
     """Return all bookings joined with customers, newest first."""
     return (
         db.query(Booking)
         .join(Customer)
+        .options(contains_eager(Booking.customer))
         .order_by(Booking.created_at.desc())
         .all()
     )
 
 
+def _contains(column, value: str):
+    """Case-insensitive substring filter with LIKE wildcards escaped."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.ilike(f"%{escaped}%", escape="\\")
+
+
+def bookings_page_query(name=None, email=None, date=None, after=None, limit: int = 50):
+    """Statement behind query_bookings; selects one row more than `limit`."""
+    q = select(
+        Booking.id,
+        Customer.name,
+        Customer.company,
+        Customer.email,
+        Customer.phone,
+        Booking.booking_type,
+        Booking.date,
+        Booking.time,
+        Booking.status,
+        Booking.email_status,
+        Booking.created_at,
+    ).join(Customer, Booking.customer_id == Customer.customer_id)
+
+    if name:
+        q = q.where(_contains(Customer.name, name))
+    if email:
+        q = q.where(_contains(Customer.email, email))
+    if date:
+        q = q.where(Booking.date == date)
+    if after is not None:
+        created_at, booking_id = after
+        q = q.where(
+            or_(
+                Booking.created_at < created_at,
+                and_(Booking.created_at == created_at, Booking.id < booking_id),
+            )
+        )
+    return q.order_by(Booking.created_at.desc(), Booking.id.desc()).limit(limit + 1)
+
+
+@traced("db.query_bookings")
+def query_bookings(db, name=None, email=None, date=None, after=None, limit: int = 50):
+    """
+    One page of bookings for the admin dashboard, newest first.
+
+    Filters run in SQL and only the displayed columns are selected from a
+    bookings-customers join. `after` is the (created_at, id) keyset cursor
+    of the last row of the previous page. Returns (rows, next_cursor);
+    next_cursor is None on the last page.
+    """
+    rows = db.execute(bookings_page_query(name, email, date, after, limit)).all()
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return rows[:limit], (last.created_at, last.id)
+    return rows, None
+
+
+@traced("db.get_bookings_by_email")
+def bookings_by_email_query(email: str):
+    """Statement behind get_bookings_by_email."""
+    return select(Booking).join(Customer).where(Customer.email == email).order_by(Booking.created_at.desc())
+
+
 def get_bookings_by_email(db, email: str):
     """Return bookings for a given email."""
-    return (
-        db.query(Booking)
-        .join(Customer)
-        .filter(Customer.email == email)
-        .order_by(Booking.created_at.desc())
-        .all()
+    return db.scalars(bookings_by_email_query(email)).all()
+
+
+@traced("db.enqueue_email")
+def enqueue_email(db, to_email: str, subject: str, body: str, booking_id: int | None = None, commit: bool = True):
+    """Add an email to the outbox; the background sender delivers it."""
+    email = EmailOutbox(to_email=to_email, subject=subject, body=body, booking_id=booking_id)
+    db.add(email)
+    if booking_id is not None:
+        db.query(Booking).filter(Booking.id == booking_id).update({"email_status": "QUEUED"})
+    if commit:
+        db.commit()
+    return email
+
+
+def claim_due_emails(db, limit: int, lease_seconds: float):
+    """
+    Atomically claim up to `limit` due emails for this sender. Claimed rows
+    are leased until now + lease_seconds; if the sender dies, they become
+    due again after the lease expires.
+    """
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    due_ids = (
+        db.query(EmailOutbox.id)
+        .filter(EmailOutbox.status.in_(["PENDING", "SENDING"]))
+        .filter(EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due_ids))
+        .values(
+            status="SENDING",
+            claim_token=token,
+            next_attempt_at=now + timedelta(seconds=lease_seconds),
+        )
+        .execution_options(synchronize_session=False)
     )
+    db.commit()
+    return db.query(EmailOutbox).filter(EmailOutbox.claim_token == token).order_by(EmailOutbox.id).all()
+
+
+@traced("db.mark_email_sent")
+def mark_email_sent(db, email):
+    """Record a successful delivery on the outbox row and its booking."""
+    email.status = "SENT"
+    email.sent_at = datetime.utcnow()
+    email.attempts += 1
+    email.last_error = None
+    if email.booking is not None:
+        email.booking.email_status = "SENT"
+
+
+@traced("db.mark_email_failed")
+def mark_email_failed(db, email, error: str, retry_at: datetime | None):
+    """Record a failed attempt; retry_at=None gives up on the email."""
+    email.attempts += 1
+    email.last_error = error[:500]
+    if retry_at is None:
+        email.status = "FAILED"
+    else:
+        email.status = "PENDING"
+        email.next_attempt_at = retry_at
+    if email.booking is not None:
+        email.booking.email_status = "FAILED" if retry_at is None else "RETRYING"
@@ -0,0 +1,172 @@
+"""
+Versioned schema migrations for bookings.db.
+
+Base.metadata.create_all only creates missing tables, so changes to
+existing tables (new columns, new indexes) are listed here and applied in
+order by migrate(). Applied versions are recorded in schema_migrations.
+Every step is idempotent because a fresh database already gets the
+current schema from create_all. Each step runs holding the SQLite write
+lock (BEGIN IMMEDIATE) and re-checks the version inside it, so several
+processes or threads may call migrate() on the same file at once.
+
+Run `python -m db.migrations` to migrate bookings.db and print the query
+plans of the hot queries (see check_query_plans).
+"""
+from contextlib import contextmanager
+from datetime import date, datetime
+from sqlalchemy import inspect, text
+from app.config import SLOT_CAPACITY
+
+
+def _add_booking_email_status(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("bookings")}
+    if "email_status" not in columns:
+        conn.execute(text("ALTER TABLE bookings ADD COLUMN email_status VARCHAR"))
+
+
+def _unique_customer_email(conn):
+    # Merge duplicate customers (same email) into the oldest row first
+    conn.execute(text(
+        "UPDATE bookings SET customer_id = ("
+        "  SELECT MIN(c2.customer_id) FROM customers c1"
+        "  JOIN customers c2 ON c2.email = c1.email"
+        "  WHERE c1.customer_id = bookings.customer_id"
+        ") WHERE customer_id NOT IN (SELECT MIN(customer_id) FROM customers GROUP BY email)"
+    ))
+    conn.execute(text(
+        "DELETE FROM customers WHERE customer_id NOT IN "
+        "(SELECT MIN(customer_id) FROM customers GROUP BY email)"
+    ))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_customers_email ON customers (email)"))
+
+
+def _booking_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bookings_date_time ON bookings (date, time)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_bookings_customer_created ON bookings (customer_id, created_at)"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bookings_created_id ON bookings (created_at, id)"))
+
+
+def _booking_idempotency_key(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("bookings")}
+    if "idempotency_key" not in columns:
+        conn.execute(text("ALTER TABLE bookings ADD COLUMN idempotency_key VARCHAR"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_bookings_idempotency_key ON bookings (idempotency_key)"
+    ))
+
+
+def _backfill_booking_slots(conn):
+    # booking_slots itself is created by create_all; count existing bookings
+    # into it with the configured capacity, never below what is already booked
+    conn.execute(
+        text(
+            "INSERT OR IGNORE INTO booking_slots (date, time, booked, capacity) "
+            "SELECT date, time, COUNT(*), MAX(COUNT(*), :capacity) FROM bookings GROUP BY date, time"
+        ),
+        {"capacity": SLOT_CAPACITY},
+    )
+
+
+# (version, description, step). Append new steps; never edit applied ones.
+MIGRATIONS = [
+    (1, "bookings.email_status column", _add_booking_email_status),
+    (2, "unique index on customers.email", _unique_customer_email),
+    (3, "bookings (date, time), (customer_id, created_at), (created_at, id) indexes", _booking_indexes),
+    (4, "bookings.idempotency_key column and unique index", _booking_idempotency_key),
+    (5, "backfill booking_slots from bookings", _backfill_booking_slots),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at DATETIME NOT NULL)"
+    ))
+
+
+def current_version(conn) -> int:
+    _ensure_version_table(conn)
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+
+@contextmanager
+def _locked(engine):
+    """
+    Transaction that holds the write lock from the start. pysqlite only
+    begins a transaction before DML, so the version check would otherwise
+    run unlocked.
+    """
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        yield conn
+
+
+def migrate(engine, metadata=None) -> list:
+    """
+    Create missing tables from `metadata` (if given), then apply pending
+    migrations, each in its own locked transaction. Returns applied versions.
+    """
+    if metadata is not None:
+        with _locked(engine) as conn:
+            metadata.create_all(conn)
+    applied = []
+    for version, description, step in MIGRATIONS:
+        with _locked(engine) as conn:
+            if current_version(conn) >= version:
+                continue
+            step(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": version, "d": description, "t": datetime.utcnow()},
+            )
+        applied.append(version)
+    return applied
+
+
+def hot_queries() -> dict:
+    """
+    {name: (statement, index it must use)} for the hot queries, built by
+    the same functions db/database.py executes them with.
+    """
+    from .database import bookings_by_email_query, bookings_page_query, customer_by_email_query
+
+    return {
+        "get_or_create_customer": (customer_by_email_query("a@example.com"), "ux_customers_email"),
+        "get_bookings_by_email": (bookings_by_email_query("a@example.com"), "ix_bookings_customer_created"),
+        "query_bookings first page": (bookings_page_query(), "ix_bookings_created_id"),
+        "query_bookings by date": (bookings_page_query(date=date(2030, 1, 1)), "ix_bookings_date_time"),
+    }
+
+
+def explain(conn, statement) -> list:
+    """SQLite EXPLAIN QUERY PLAN detail lines for a SQLAlchemy statement."""
+    sql = statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def check_query_plans(engine) -> dict:
+    """Return {query name: (uses expected index, plan lines)}."""
+    results = {}
+    with engine.connect() as conn:
+        for name, (statement, index) in hot_queries().items():
+            plan = explain(conn, statement)
+            results[name] = (any(index in line for line in plan), plan)
+    return results
+
+
+if __name__ == "__main__":
+    from .database import engine, init_db
+
+    init_db()
+    with engine.connect() as conn:
+        print(f"schema version: {current_version(conn)}")
+    failed = False
+    for name, (ok, plan) in check_query_plans(engine).items():
+        print(f"[{'ok' if ok else 'MISSING INDEX'}] {name}")
+        for line in plan:
+            print(f"    {line}")
+        failed |= not ok
+    raise SystemExit(1 if failed else 0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Time, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, Time, DateTime, ForeignKey, Index, CheckConstraint
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -20,6 +20,8 @@ class Customer(Base):
 
     bookings = relationship("Booking", back_populates="customer")
 
+    __table_args__ = (Index("ux_customers_email", "email", unique=True),)
+
 
 class Booking(Base):
     """
@@ -35,5 +37,56 @@ class Booking(Base):
     time = Column(Time, nullable=False)
     status = Column(String, default="CONFIRMED")
     created_at = Column(DateTime, default=datetime.utcnow)
+    email_status = Column(String, nullable=True)  # QUEUED / RETRYING / SENT / FAILED
+    idempotency_key = Column(String, nullable=True)  # client key; retries reuse the booking
 
     customer = relationship("Customer", back_populates="bookings")
+    emails = relationship("EmailOutbox", back_populates="booking")
+
+    # Existing databases get these through db/migrations.py
+    __table_args__ = (
+        Index("ix_bookings_date_time", "date", "time"),
+        Index("ix_bookings_customer_created", "customer_id", "created_at"),
+        Index("ix_bookings_created_id", "created_at", "id"),
+        Index("ux_bookings_idempotency_key", "idempotency_key", unique=True),
+    )
+
+
+class BookingSlot(Base):
+    """
+    Places taken in a consultation slot. A booking reserves its slot with
+    one atomic upsert that fails once `booked` reaches `capacity`.
+    """
+    __tablename__ = "booking_slots"
+
+    date = Column(Date, primary_key=True)
+    time = Column(Time, primary_key=True)
+    booked = Column(Integer, nullable=False, default=0)
+    capacity = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (CheckConstraint("booked <= capacity", name="ck_booking_slots_capacity"),)
+
+
+class EmailOutbox(Base):
+    """
+    Outbound email waiting for (or done with) delivery by the background
+    sender in app/outbox.py.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="PENDING")  # PENDING / SENDING / SENT / FAILED
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = Column(String, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    booking = relationship("Booking", back_populates="emails")
+
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),)
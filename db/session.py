@@ -1,9 +1,62 @@
-from sqlalchemy import create_engine
+import os
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
-# SQLite database path (adjust if needed)
-DATABASE_URL = "sqlite:///bookings.db"
+# SQLite database path (override with NEOCONSULT_DB_URL, e.g. for load tests)
+DATABASE_URL = os.getenv("NEOCONSULT_DB_URL", "sqlite:///bookings.db")
+
+# Connection pool shared by every Streamlit session thread in this process
+POOL_SIZE = 10
+MAX_OVERFLOW = 20
+BUSY_TIMEOUT_SECONDS = 5
+
+# Applied to every new SQLite connection. WAL lets dashboard reads run
+# while a booking is being written; synchronous=NORMAL is durable in WAL
+# mode except for the last transactions on power loss.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # KiB, i.e. 64 MB per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": BUSY_TIMEOUT_SECONDS * 1000,
+    "temp_store": "MEMORY",
+}
+
+
+def make_engine(url: str = DATABASE_URL):
+    """Create an engine; SQLite connections get SQLITE_PRAGMAS on connect."""
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_pre_ping=True)
+
+    kwargs = {"connect_args": {"check_same_thread": False, "timeout": BUSY_TIMEOUT_SECONDS}}
+    if ":memory:" not in url and url not in ("sqlite://", "sqlite:///"):
+        kwargs.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_pre_ping=True)
+    engine = create_engine(url, **kwargs)
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
 
 # SQLAlchemy engine and session
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@contextmanager
+def session_scope():
+    """Session that is rolled back on error and always closed."""
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+# db.session creates its engine at import: point it at a scratch file first
+os.environ.setdefault(
+    "NEOCONSULT_DB_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='neoconsult-tests-'), 'bookings.db')}",
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from db.models import Base
+from db.session import make_engine
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Session factory bound to a fresh SQLite database per test."""
+    engine = make_engine(f"sqlite:///{tmp_path / 'bookings.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
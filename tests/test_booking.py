@@ -0,0 +1,135 @@
+import threading
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.tools import booking_persistence_tool
+from db.database import (
+    SlotUnavailableError,
+    create_booking_with_customer,
+    get_bookings_by_email,
+    get_slot_usage,
+    query_bookings,
+    reserve_slot,
+)
+from db.models import Booking, BookingSlot
+
+DAY = date.today() + timedelta(days=5)
+PAYLOAD = {
+    "name": "Ann",
+    "company": "Acme",
+    "email": "ann@example.com",
+    "phone": "123",
+    "booking_type": "Data Platform",
+    "date": DAY,
+    "time": time(10, 0),
+}
+EMAIL = {"subject": "Confirmed", "body": "See you"}
+
+
+def create(db, key, email="ann@example.com"):
+    return create_booking_with_customer(
+        db,
+        name="Ann",
+        email=email,
+        phone="123",
+        company="Acme",
+        booking_type="Data Platform",
+        date_obj=DAY,
+        time_obj=time(10, 0),
+        idempotency_key=key,
+        slot_capacity=1,
+    )
+
+
+def test_retry_with_same_key_returns_existing_booking(session_factory):
+    db = session_factory()
+    booking_id, customer_id, created = create(db, "key-1")
+    assert created
+    assert create(db, "key-1") == (booking_id, customer_id, False)
+    with pytest.raises(SlotUnavailableError):
+        create(db, "key-2", email="bob@example.com")
+    db.close()
+
+
+def test_concurrent_retries_with_same_key_all_get_the_booking(session_factory):
+    barrier = threading.Barrier(6)
+    results, errors = [], []
+
+    def run():
+        db = session_factory()
+        try:
+            barrier.wait()
+            results.append(create(db, "same-key"))
+        except Exception as e:  # collected and asserted below
+            errors.append(e)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=run) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len({booking_id for booking_id, _, _ in results}) == 1
+    assert sum(created for _, _, created in results) == 1
+
+
+class BrokenMailer:
+    def wake(self):
+        raise RuntimeError("sender thread is gone")
+
+
+def test_committed_booking_is_reported_even_if_the_sender_cannot_be_woken(session_factory):
+    db = session_factory()
+    result = booking_persistence_tool(db, PAYLOAD, "key-3", EMAIL, mailer=BrokenMailer())
+    assert result["success"]
+    assert result["created"]
+    db.close()
+
+    db = session_factory()
+    assert db.get(Booking, result["booking_id"]).email_status == "QUEUED"
+    db.close()
+
+
+def test_off_grid_time_is_refused(session_factory):
+    db = session_factory()
+    assert booking_persistence_tool(db, PAYLOAD, "key-4", EMAIL, mailer=BrokenMailer())["success"]
+    result = booking_persistence_tool(
+        db, {**PAYLOAD, "email": "bob@example.com", "time": time(10, 1)}, "key-5", EMAIL, mailer=BrokenMailer()
+    )
+    assert not result["success"]
+    assert "not a bookable time" in result["error"]
+    db.close()
+
+
+def test_raising_the_capacity_reopens_a_full_slot(session_factory):
+    db = session_factory()
+    assert reserve_slot(db, DAY, time(10, 0), 1)
+    assert not reserve_slot(db, DAY, time(10, 0), 1)
+    assert get_slot_usage(db, DAY, DAY, 3) == {(DAY, time(10, 0)): 2}
+
+    assert reserve_slot(db, DAY, time(10, 0), 3)
+    assert reserve_slot(db, DAY, time(10, 0), 3)
+    assert not reserve_slot(db, DAY, time(10, 0), 3)
+    slot = db.get(BookingSlot, (DAY, time(10, 0)))
+    assert (slot.booked, slot.capacity) == (3, 3)
+    db.close()
+
+
+def test_booking_lookups(session_factory):
+    db = session_factory()
+    first = create(db, "key-6")[0]
+    second = create_booking_with_customer(
+        db, "Ann", "ann@example.com", "123", "Acme", "Audit", DAY, time(11, 0), idempotency_key="key-7"
+    )[0]
+    assert [b.id for b in get_bookings_by_email(db, "ann@example.com")] == [second, first]
+
+    rows, cursor = query_bookings(db, email="ANN@", limit=1)
+    assert [r.id for r in rows] == [second] and cursor is not None
+    rows, cursor = query_bookings(db, email="ANN@", after=cursor, limit=1)
+    assert [r.id for r in rows] == [first] and cursor is None
+    assert query_bookings(db, name="nobody") == ([], None)
+    db.close()
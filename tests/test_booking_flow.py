@@ -0,0 +1,27 @@
+from datetime import date, datetime, time
+
+from app.booking_flow import is_slot_time, slot_times, suggest_free_slots
+from app.config import SLOT_DAY_END_HOUR, SLOT_DAY_START_HOUR
+
+
+def test_only_grid_times_inside_opening_hours_are_slots():
+    assert is_slot_time(time(SLOT_DAY_START_HOUR, 0))
+    assert is_slot_time(slot_times()[-1])
+    assert not is_slot_time(time(10, 1))
+    assert not is_slot_time(time(SLOT_DAY_START_HOUR - 1, 0))
+    assert not is_slot_time(time(SLOT_DAY_END_HOUR, 0))
+
+
+def test_suggestions_skip_times_that_already_passed_today():
+    now = datetime(2030, 1, 1, 14, 10)
+    suggestions = suggest_free_slots({}, date(2030, 1, 1), time(10, 0), days=2, limit=5, now=now)
+    assert suggestions
+    assert all(datetime.combine(d, t) > now for d, t in suggestions)
+    assert suggestions[0] == (date(2030, 1, 1), time(14, 30))
+
+
+def test_suggestions_skip_full_slots():
+    day = date(2030, 1, 2)
+    full = {(day, time(10, 30)): 0, (day, time(9, 30)): 0}
+    suggestions = suggest_free_slots(full, day, time(10, 0), days=1, limit=2, now=datetime(2030, 1, 1))
+    assert suggestions == [(day, time(9, 0)), (day, time(11, 0))]
@@ -0,0 +1,67 @@
+import random
+
+import numpy as np
+
+from app.chunking import ChunkTable, ChunkedDocument, chunk_pages, chunk_spans
+from app.sentence_index import SentenceIndex, top_sentences
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+
+
+def sentences_text(n=120, seed=1):
+    rng = random.Random(seed)
+    return " ".join(" ".join(rng.choices(WORDS, k=rng.randint(5, 15))).capitalize() + "." for _ in range(n))
+
+
+def test_windows_cover_the_text_and_start_at_sentences():
+    data = sentences_text().encode("utf-8")
+    spans = chunk_spans(data, 200, 50)
+    assert len(spans) > 1
+    assert spans[0][0] == 0 and spans[-1][1] == len(data.rstrip())
+    for (s1, e1), (s2, e2) in zip(spans, spans[1:]):
+        assert s1 < s2 < e1 <= e2  # overlapping and advancing
+        assert len(data[s2:e1].split()) <= 50
+        assert data[s2:s2 + 1].isupper()  # next window starts a sentence
+        assert data[:e1].endswith(b".")  # cut at a sentence end
+    assert all(len(data[s:e].split()) <= 200 for s, e in spans)
+
+
+def test_text_without_sentences_is_cut_into_fixed_windows():
+    data = " ".join(["word"] * 25).encode("utf-8")
+    spans = chunk_spans(data, 10, 3)
+    assert [len(data[s:e].split()) for s, e in spans] == [10, 10, 10, 4]
+    assert chunk_spans(b"   ") == []
+
+
+def test_chunk_table_take_save_and_load(tmp_path):
+    table = ChunkTable()
+    table.append("a", chunk_pages(["First page. It has two sentences.", "Second page."], 4, 1))
+    table.append("b", ChunkedDocument.from_chunks(["other chunk", "last chunk"]))
+    texts = list(table)
+    assert table.page(0) == 1 and table.page(len(table) - 1) is None
+
+    table.save(str(tmp_path))
+    loaded = ChunkTable.load(str(tmp_path))
+    assert list(loaded) == texts
+    assert loaded.documents == ["a", "b"]
+
+    only_b = loaded.take(np.flatnonzero(loaded.doc_mask("b")))
+    assert list(only_b) == ["other chunk", "last chunk"]
+    assert only_b.documents == ["b"]
+
+
+def test_sentence_index_finds_sentences_of_a_chunk():
+    pages = ["Data audits take two weeks. Pricing is fixed.".encode("utf-8"), "Café ünïcode works. Done.".encode("utf-8")]
+    index = SentenceIndex.build(pages)
+    text = b"".join(pages)
+    assert [text[s:e].decode("utf-8") for s, e in index.spans] == [
+        "Data audits take two weeks.", "Pricing is fixed.", "Café ünïcode works.", "Done.",
+    ]
+    assert index.between(0, len(pages[0])) == (0, 2)
+
+    merged, offsets = SentenceIndex.concat([index, index])
+    assert len(merged) == 8 and list(offsets) == [0, 4, 8]
+    assert np.array_equal(merged.slice(4, 8).terms, index.terms)
+
+    parts = [(index, text, 0, len(text))]
+    assert top_sentences(parts, "how long do audits take?", 1) == ["Data audits take two weeks."]
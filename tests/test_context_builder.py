@@ -0,0 +1,74 @@
+import random
+
+from app.config import CHAT_MEMORY_LIMIT, HISTORY_SUMMARY_WORDS, RAG_TOP_K
+from app.context_builder import build_context, build_history, count_tokens, select_chunks
+from app.rag_pipeline import chunk_text
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+
+
+def sentences_text(n=120, seed=1):
+    rng = random.Random(seed)
+    return " ".join(" ".join(rng.choices(WORDS, k=rng.randint(5, 15))).capitalize() + "." for _ in range(n))
+
+
+def test_sentence_aligned_window_overlap_is_stripped():
+    text = sentences_text()
+    chunks = chunk_text(text, 200, 50)
+    first, second = chunks[0].split(), chunks[1].split()
+    shared = next(n for n in range(50, 0, -1) if first[-n:] == second[:n])
+    assert shared != 50  # windows do not share exactly `overlap` words
+
+    selected, _ = select_chunks([(0, chunks[0], 0.1), (1, chunks[1], 0.2)], 10_000, overlap=50)
+    joined = " ".join(t for _, t in selected).split()
+    assert len(joined) == len(first) + len(second) - shared
+    assert joined == text.split()[:len(joined)]
+
+    # Either order: the later chunk loses the part the earlier one has
+    selected, _ = select_chunks([(1, chunks[1], 0.1), (0, chunks[0], 0.2)], 10_000, overlap=50)
+    assert selected[1][1].split() == first[:-shared]
+
+
+def test_chunks_fill_the_budget_by_relevance_per_token_in_rank_order():
+    short = " ".join(["pricing"] * 40)
+    long = " ".join(f"audit{i}" for i in range(400))
+    hits = [(0, long, 0.1), (1, short, 0.5), (2, "team offices " * 10, 0.6)]
+    budget = count_tokens(short) + count_tokens("team offices " * 10)
+    selected, _ = select_chunks(hits, budget)
+    assert [cid for cid, _ in selected] == [1, 2]
+    assert sum(count_tokens(t) for _, t in selected) <= budget
+    assert select_chunks(hits, 0) == ([], 0)
+
+
+def test_near_duplicate_chunks_are_dropped():
+    base = " ".join(f"word{i}" for i in range(100))
+    near = base + " extra"
+    other = " ".join(f"other{i}" for i in range(100))
+    selected, duplicates = select_chunks([(0, base, 0.1), (1, near, 0.2), (2, other, 0.3)], 10_000)
+    assert [cid for cid, _ in selected] == [0, 2]
+    assert duplicates == 1
+
+
+def test_history_keeps_newest_verbatim_and_shortens_older_messages():
+    history = [{"role": "user", "content": " ".join([f"m{i}"] * 200)} for i in range(30)]
+    full = count_tokens(f"user: {history[-1]['content']}") + 1
+    short = count_tokens("user (earlier): " + " ".join(["m10"] * HISTORY_SUMMARY_WORDS) + " …") + 1
+    budget = 2 * full + 3 * short
+    text, verbatim, summarized = build_history(history, budget=budget)
+    lines = text.splitlines()
+    assert (verbatim, summarized) == (2, 3)
+    assert lines[-1] == f"user: {history[-1]['content']}"
+    assert lines[0] == "user (earlier): " + " ".join(["m25"] * HISTORY_SUMMARY_WORDS) + " …"
+    assert count_tokens(text) <= budget
+    assert build_history(history, budget=0) == ("", 0, 0)
+
+
+def test_report_baseline_uses_configured_top_k_and_history():
+    hits = [(i, " ".join([f"chunk{i}"] * 50), 0.1 * i) for i in range(RAG_TOP_K + 2)]
+    history = [{"role": "user", "content": f"message {i}"} for i in range(CHAT_MEMORY_LIMIT + 10)]
+    _, _, report = build_context("question", hits, history)
+    naive = "\n\n".join(c for _, c, _ in hits[:RAG_TOP_K]) + "\n".join(
+        f"{m['role']}: {m['content']}" for m in history[-CHAT_MEMORY_LIMIT:]
+    )
+    assert report.tokens_before == count_tokens(naive) + count_tokens("question")
+    assert report.chunks_in == len(hits)
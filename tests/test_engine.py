@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+
+from app.engine import ChatEngine
+from db.models import Booking
+
+DAY = date.today() + timedelta(days=5)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubMailer:
+    def wake(self):
+        pass
+
+
+@pytest.fixture
+def engine(session_factory):
+    @contextmanager
+    def scope():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    engine = ChatEngine(db_scope=scope, mailer=StubMailer(), stream=False)
+    engine.session_factory = session_factory
+    return engine
+
+
+def start_booking(engine):
+    session = engine.new_session()
+    engine.handle(session, "I'd like to book a consultation")
+    for answer in ("Ann", "Acme", "ann@example.com", "123", "Data Platform"):
+        engine.handle(session, answer)
+    return session
+
+
+def test_unparseable_date_and_time_are_asked_again(engine):
+    session = start_booking(engine)
+    assert "YYYY-MM-DD" in engine.handle(session, "next tuesday")
+    assert "date" not in session.booking
+
+    engine.handle(session, f" {DAY.isoformat()} ")
+    assert session.booking["date"] == DAY.isoformat()
+    assert "HH:MM" in engine.handle(session, "ten o'clock")
+    assert "time" not in session.booking
+
+    assert "confirm" in engine.handle(session, "9:00")
+    assert session.booking["time"] == "09:00"
+    assert "Booking confirmed" in engine.handle(session, "yes")
+    with engine.session_factory() as db:
+        assert db.query(Booking).count() == 1
+
+
+def test_cancel_clears_the_collected_booking(engine):
+    session = start_booking(engine)
+    engine.handle(session, DAY.isoformat())
+    engine.handle(session, "10:00")
+    assert "cancelled" in engine.handle(session, "no")
+    assert session.mode == "chat" and not session.booking and session.booking_key is None
+
+    session = start_booking(engine)
+    assert "cancelled" in engine.handle(session, "cancel")
+    assert session.mode == "chat" and not session.booking
+
+
+def test_server_runs_without_streamlit():
+    code = (
+        "import sys; sys.modules['streamlit'] = None\n"
+        "from app.server import ChatServer, engine_from_env\n"
+        "engine = engine_from_env()\n"
+        "print(engine.handle(engine.new_session(), 'book a consultation'))\n"
+        "engine.mailer.stop()\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert "full name" in out.stdout
@@ -0,0 +1,74 @@
+import threading
+
+from sqlalchemy import text
+
+from app.config import SLOT_CAPACITY
+from db.migrations import MIGRATIONS, _backfill_booking_slots, check_query_plans, current_version, migrate
+from db.models import Base
+from db.session import make_engine
+
+
+def test_concurrent_migrate_applies_each_version_once(tmp_path):
+    url = f"sqlite:///{tmp_path / 'bookings.db'}"
+    engines = [make_engine(url) for _ in range(8)]
+    barrier = threading.Barrier(len(engines))
+    errors = []
+
+    def run(engine):
+        barrier.wait()
+        try:
+            migrate(engine, Base.metadata)
+        except Exception as e:  # collected and asserted below
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(e,)) for e in engines]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with engines[0].connect() as conn:
+        assert current_version(conn) == MIGRATIONS[-1][0]
+        versions = [r[0] for r in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+    assert versions == [v for v, _, _ in MIGRATIONS]
+    for engine in engines:
+        engine.dispose()
+
+
+def test_migrate_is_a_no_op_when_current(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'bookings.db'}")
+    assert migrate(engine, Base.metadata) == [v for v, _, _ in MIGRATIONS]
+    assert migrate(engine, Base.metadata) == []
+    engine.dispose()
+
+
+def test_backfilled_slots_get_the_configured_capacity(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'bookings.db'}")
+    migrate(engine, Base.metadata)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO customers (customer_id, name, email, phone) VALUES (1, 'Ann', 'a@x.io', '1')"))
+        for _ in range(SLOT_CAPACITY + 1):
+            conn.execute(text(
+                "INSERT INTO bookings (customer_id, booking_type, date, time, status) "
+                "VALUES (1, 'Audit', '2030-01-02', '10:00:00.000000', 'CONFIRMED')"
+            ))
+        conn.execute(text(
+            "INSERT INTO bookings (customer_id, booking_type, date, time, status) "
+            "VALUES (1, 'Audit', '2030-01-02', '11:00:00.000000', 'CONFIRMED')"
+        ))
+        _backfill_booking_slots(conn)
+        rows = dict(conn.execute(text("SELECT time, capacity FROM booking_slots")).all())
+    assert rows == {"10:00:00.000000": SLOT_CAPACITY + 1, "11:00:00.000000": SLOT_CAPACITY}
+    engine.dispose()
+
+
+def test_hot_queries_use_their_indexes(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'bookings.db'}")
+    migrate(engine, Base.metadata)
+    plans = check_query_plans(engine)
+    assert set(plans) == {
+        "get_or_create_customer", "get_bookings_by_email", "query_bookings first page", "query_bookings by date",
+    }
+    assert {name: ok for name, (ok, _) in plans.items()} == dict.fromkeys(plans, True)
+    engine.dispose()
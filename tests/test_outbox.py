@@ -0,0 +1,175 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+import app.outbox as outbox
+from app.config import OUTBOX_BACKOFF_SECONDS, OUTBOX_MAX_ATTEMPTS
+from db.database import create_booking_with_customer
+from db.models import Booking, EmailOutbox
+
+SMTP_SETTINGS = {"host": "smtp.test", "port": 587, "user": "bookings@neoconsult.test", "password": "x"}
+
+
+class StubSMTP:
+    """smtplib.SMTP stand-in recording sent messages; fails while `failures` > 0."""
+
+    sent = []
+    failures = 0
+
+    def __init__(self, host, port=0, timeout=None):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, msg):
+        if StubSMTP.failures:
+            StubSMTP.failures -= 1
+            raise outbox.smtplib.SMTPRecipientsRefused({msg["To"]: (550, b"mailbox unavailable")})
+        StubSMTP.sent.append(msg)
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def sender(session_factory, monkeypatch):
+    StubSMTP.sent = []
+    StubSMTP.failures = 0
+    monkeypatch.setattr(outbox.smtplib, "SMTP", StubSMTP)
+    monkeypatch.setattr(outbox, "is_deliverable_email", lambda email: True)
+    return outbox.OutboxSender(SMTP_SETTINGS, session_factory)
+
+
+def book(session_factory, email="ann@example.com"):
+    db = session_factory()
+    try:
+        booking_id, _, _ = create_booking_with_customer(
+            db,
+            name="Ann",
+            email=email,
+            phone="123",
+            company="Acme",
+            booking_type="Data Platform",
+            date_obj=date.today() + timedelta(days=3),
+            time_obj=time(10, 0),
+            confirmation_email={"subject": "Confirmed", "body": "See you"},
+        )
+        return booking_id
+    finally:
+        db.close()
+
+
+def load(session_factory, booking_id):
+    db = session_factory()
+    try:
+        email = db.query(EmailOutbox).filter(EmailOutbox.booking_id == booking_id).one()
+        booking = db.get(Booking, booking_id)
+        return email, booking
+    finally:
+        db.close()
+
+
+def make_due(session_factory, booking_id):
+    db = session_factory()
+    try:
+        db.query(EmailOutbox).filter(EmailOutbox.booking_id == booking_id).update(
+            {"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_sends_queued_email_and_records_status_on_booking(sender, session_factory):
+    booking_id = book(session_factory)
+    assert load(session_factory, booking_id)[1].email_status == "QUEUED"
+
+    assert sender.process_due() == 1
+
+    email, booking = load(session_factory, booking_id)
+    assert [m["To"] for m in StubSMTP.sent] == ["ann@example.com"]
+    assert email.status == "SENT"
+    assert email.attempts == 1
+    assert email.sent_at is not None
+    assert booking.email_status == "SENT"
+    assert sender.process_due() == 0
+
+
+def test_failed_send_is_retried_with_exponential_backoff(sender, session_factory):
+    booking_id = book(session_factory)
+    StubSMTP.failures = 2
+
+    before = datetime.utcnow()
+    assert sender.process_due() == 1
+    email, booking = load(session_factory, booking_id)
+    assert email.status == "PENDING"
+    assert email.attempts == 1
+    assert "mailbox unavailable" in email.last_error
+    assert booking.email_status == "RETRYING"
+    first_delay = (email.next_attempt_at - before).total_seconds()
+    assert OUTBOX_BACKOFF_SECONDS - 1 <= first_delay <= OUTBOX_BACKOFF_SECONDS + 5
+
+    # Not due yet: nothing is claimed
+    assert sender.process_due() == 0
+
+    make_due(session_factory, booking_id)
+    before = datetime.utcnow()
+    assert sender.process_due() == 1
+    email, _ = load(session_factory, booking_id)
+    assert email.attempts == 2
+    second_delay = (email.next_attempt_at - before).total_seconds()
+    assert 2 * OUTBOX_BACKOFF_SECONDS - 1 <= second_delay <= 2 * OUTBOX_BACKOFF_SECONDS + 5
+
+    make_due(session_factory, booking_id)
+    assert sender.process_due() == 1
+    email, booking = load(session_factory, booking_id)
+    assert email.status == "SENT"
+    assert email.attempts == 3
+    assert booking.email_status == "SENT"
+
+
+def test_gives_up_after_max_attempts(sender, session_factory):
+    booking_id = book(session_factory)
+    StubSMTP.failures = OUTBOX_MAX_ATTEMPTS + 1
+
+    for attempt in range(1, OUTBOX_MAX_ATTEMPTS + 1):
+        make_due(session_factory, booking_id)
+        assert sender.process_due() == 1
+        email, booking = load(session_factory, booking_id)
+        assert email.attempts == attempt
+    assert email.status == "FAILED"
+    assert booking.email_status == "FAILED"
+    assert StubSMTP.sent == []
+
+    make_due(session_factory, booking_id)
+    assert sender.process_due() == 0
+
+
+def test_undeliverable_domain_fails_without_sending(sender, session_factory, monkeypatch):
+    monkeypatch.setattr(outbox, "is_deliverable_email", lambda email: False)
+    booking_id = book(session_factory)
+
+    assert sender.process_due() == 1
+
+    email, booking = load(session_factory, booking_id)
+    assert email.status == "FAILED"
+    assert booking.email_status == "FAILED"
+    assert StubSMTP.sent == []
+
+
+def test_unknown_deliverability_is_retried_later(sender, session_factory, monkeypatch):
+    monkeypatch.setattr(outbox, "is_deliverable_email", lambda email: None)
+    booking_id = book(session_factory)
+
+    assert sender.process_due() == 1
+
+    email, booking = load(session_factory, booking_id)
+    assert email.status == "PENDING"
+    assert email.attempts == 1
+    assert email.next_attempt_at > datetime.utcnow()
+    assert booking.email_status == "RETRYING"
+    assert StubSMTP.sent == []
@@ -0,0 +1,33 @@
+import pytest
+
+from app.answer_cache import MemoryAnswerCache
+from app.tools import rag_tool
+from benchmarks.common import StubLLMClient
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_answers_are_cached(stream):
+    cache = MemoryAnswerCache()
+    llm = StubLLMClient(latency_ms=0, tokens=3)
+
+    def ask():
+        answer = rag_tool("What do you offer?", None, [], stream=stream, llm_client=llm, answer_cache=cache)
+        return answer if isinstance(answer, str) else "".join(answer)
+
+    assert ask() == "word0 word1 word2 "
+    assert ask() == "word0 word1 word2 "
+    assert llm.calls == 1
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_empty_completions_get_the_fallback_and_are_not_cached(stream):
+    cache = MemoryAnswerCache()
+    llm = StubLLMClient(latency_ms=0, tokens=0)
+
+    for _ in range(2):
+        answer = rag_tool("What do you offer?", None, [], stream=stream, llm_client=llm, answer_cache=cache)
+        answer = answer if isinstance(answer, str) else "".join(answer)
+        assert "unable to use the language model" in answer
+
+    assert llm.calls == 2
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,72 @@
+import asyncio
+import base64
+import json
+import os
+import struct
+
+import app.server as server
+from app.engine import ChatSession
+from app.server import ChatServer, SessionRegistry
+
+
+def test_idle_sessions_expire_on_lookup(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: now[0])
+    registry = SessionRegistry(ttl=60)
+    session_id = registry.create(ChatSession()).session.session_id
+
+    now[0] += 59
+    assert registry.get(session_id) is not None
+    now[0] += 59  # last use refreshed the deadline
+    assert registry.get(session_id) is not None
+    now[0] += 61
+    assert registry.get(session_id) is None
+    assert len(registry) == 0
+
+
+class FailingEngine:
+    def new_session(self):
+        return ChatSession()
+
+    def handle(self, session, message):
+        raise RuntimeError("database is locked")
+
+
+def _client_frame(text: str) -> bytes:
+    data = text.encode("utf-8")
+    mask = os.urandom(4)
+    masked = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+    return struct.pack("!BB", 0x81, 0x80 | len(data)) + mask + masked
+
+
+async def _read_json_frame(reader):
+    _, n = await reader.readexactly(2)
+    return json.loads(await reader.readexactly(n & 0x7F))
+
+
+def test_websocket_turn_errors_are_sent_as_error_frames():
+    async def scenario():
+        chat = ChatServer(FailingEngine(), workers=1)
+        listener = await asyncio.start_server(chat.handle_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        writer.write(
+            (
+                "GET /ws HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+            ).encode("latin-1")
+        )
+        assert (await reader.readuntil(b"\r\n\r\n")).startswith(b"HTTP/1.1 101")
+        assert (await _read_json_frame(reader))["type"] == "session"
+
+        for _ in range(2):  # the connection stays usable after an error
+            writer.write(_client_frame("hello"))
+            assert await _read_json_frame(reader) == {"type": "error", "error": "database is locked"}
+
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        chat.executor.shutdown()
+
+    asyncio.run(asyncio.wait_for(scenario(), 10))
@@ -0,0 +1,71 @@
+import dns.resolver
+import pytest
+from email_validator import EmailUndeliverableError, validate_email as real_validate_email
+
+import utils.validators as validators
+from utils.validators import is_deliverable_email, is_valid_email, validate_emails
+
+
+@pytest.fixture
+def dns_lookups(monkeypatch):
+    """Replace DNS with canned answers per domain; returns the looked-up domains."""
+    lookups = []
+
+    def fake_validate_email(email, check_deliverability=True, timeout=None):
+        info = real_validate_email(email, check_deliverability=False)
+        if not check_deliverability:
+            return info
+        lookups.append(info.domain)
+        if info.domain == "gone-mail.com":
+            raise EmailUndeliverableError("The domain name gone-mail.com does not exist.") from dns.resolver.NXDOMAIN()
+        if info.domain == "nullmx-mail.com":
+            raise EmailUndeliverableError("The domain name nullmx-mail.com does not accept email.")
+        if info.domain == "flaky-mail.com":
+            raise EmailUndeliverableError("There was an error while checking ...") from RuntimeError("SERVFAIL")
+        if info.domain != "slow-mail.com":  # slow-mail.com: DNS timed out, no mx
+            info.mx = [(10, f"mx.{info.domain}")]
+        return info
+
+    monkeypatch.setattr(validators, "validate_email", fake_validate_email)
+    monkeypatch.setattr(validators, "_domain_cache", validators.TTLCache(100, 60))
+    return lookups
+
+
+def test_syntax_check_never_looks_up_dns(dns_lookups):
+    assert is_valid_email("ann@example.com")
+    assert not is_valid_email("ann@")
+    assert not is_valid_email("not an email")
+    assert dns_lookups == []
+
+
+def test_definitive_answers_are_cached_per_domain(dns_lookups):
+    assert is_deliverable_email("a@ok-mail.com") is True
+    assert is_deliverable_email("b@ok-mail.com") is True
+    assert is_deliverable_email("a@gone-mail.com") is False
+    assert is_deliverable_email("b@gone-mail.com") is False
+    assert is_deliverable_email("a@nullmx-mail.com") is False
+    assert is_deliverable_email("a@nullmx-mail.com") is False
+    assert dns_lookups == ["ok-mail.com", "gone-mail.com", "nullmx-mail.com"]
+
+
+def test_resolver_errors_and_timeouts_are_unknown_and_not_cached(dns_lookups):
+    assert is_deliverable_email("a@flaky-mail.com") is None
+    assert is_deliverable_email("a@flaky-mail.com") is None
+    assert is_deliverable_email("a@slow-mail.com") is None
+    assert dns_lookups == ["flaky-mail.com", "flaky-mail.com", "slow-mail.com"]
+
+
+def test_validate_emails_checks_each_domain_once(dns_lookups):
+    results = validate_emails(
+        ["a@ok-mail.com", "b@ok-mail.com", "a@ok-mail.com", "bad@", "a@gone-mail.com", "a@flaky-mail.com"],
+        check_deliverability=True,
+    )
+    assert results == {
+        "a@ok-mail.com": True,
+        "b@ok-mail.com": True,
+        "bad@": False,
+        "a@gone-mail.com": False,
+        "a@flaky-mail.com": None,
+    }
+    assert dns_lookups == ["ok-mail.com", "gone-mail.com", "flaky-mail.com"]
+    assert validate_emails(["a@ok-mail.com", "bad@"]) == {"a@ok-mail.com": True, "bad@": False}
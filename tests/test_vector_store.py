@@ -0,0 +1,25 @@
+import numpy as np
+
+from app.config import EMBED_DIM
+from app.rag_pipeline import SimpleVectorStore
+
+
+def _embeddings(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, EMBED_DIM)).astype("float32")
+
+
+def test_bm25_is_rebuilt_lazily_after_changes():
+    store = SimpleVectorStore()
+    chunks = ["pricing for data audits", "project consultation slots", "team and offices"]
+    store.add_documents({"a": chunks}, {"a": _embeddings(3)})
+    store.add_documents({"b": ["consultation pricing faq"]}, {"b": _embeddings(1, 1)})
+    assert store.bm25 is None
+
+    texts = [text for text, _ in store.similarity_search("consultation", 4, mode="sparse")]
+    assert set(texts) == {"project consultation slots", "consultation pricing faq"}
+    assert store.bm25 is not None
+
+    store.remove_document("b")
+    assert store.bm25 is None
+    texts = [text for text, _ in store.similarity_search("consultation", 4, mode="sparse")]
+    assert texts == ["project consultation slots"]
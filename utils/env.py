@@ -0,0 +1,20 @@
+import os
+import sys
+
+
+def get_setting(name: str, default=None):
+    """
+    Value of `name` from the environment, else from the Streamlit secrets
+    (.streamlit/secrets.toml) when running under Streamlit, else `default`.
+    Streamlit is never imported here, so this works without it installed.
+    """
+    value = os.getenv(name)
+    if value is not None:
+        return value
+    st = sys.modules.get("streamlit")
+    if st is not None:
+        try:
+            return st.secrets.get(name, default)
+        except Exception:
+            pass  # no secrets file
+    return default
@@ -0,0 +1,53 @@
+"""
+Import-time report for the Streamlit entry points.
+
+    python -m utils.import_report [module ...]
+
+Imports each module in a fresh interpreter with `-X importtime`, prints
+the total and the slowest imports, and exits non-zero if a module pulls
+in one of HEAVY_MODULES at import time.
+"""
+import subprocess
+import sys
+
+DEFAULT_MODULES = ["app.chat_logic", "app.admin_dashboard"]
+
+# Must only be imported on first use, never by the entry points
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "faiss", "openai"]
+
+
+def import_times(module: str) -> dict:
+    """{imported module: cumulative microseconds} for `import module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def report(module: str, top: int = 10) -> bool:
+    """Print the report for one module; return False if heavy modules were imported."""
+    times = import_times(module)
+    total = times.get(module, max(times.values(), default=0))
+    print(f"{module}: {total / 1000:.0f} ms")
+    for name, us in sorted(times.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"    {us / 1000:8.1f} ms  {name}")
+    heavy = sorted({h for h in HEAVY_MODULES if h in times})
+    if heavy:
+        print(f"    heavy imports at load time: {', '.join(heavy)}")
+    return not heavy
+
+
+if __name__ == "__main__":
+    modules = sys.argv[1:] or DEFAULT_MODULES
+    ok = all([report(m) for m in modules])
+    raise SystemExit(0 if ok else 1)
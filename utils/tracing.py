@@ -0,0 +1,284 @@
+"""
+Lightweight request tracing for the hot paths.
+
+    with span("rag_tool.llm", model=LLM_MODEL):
+        ...
+
+    @traced("db.query_bookings")
+    def query_bookings(...): ...
+
+Spans nest through a context variable; a span without a parent starts a
+trace (one chat turn, one upload, one outbox batch). Finished traces go
+to an in-memory ring buffer, optionally to a JSON-lines file, and feed
+per-stage latency histograms that can be served as Prometheus text.
+
+Tracing is off unless NEOCONSULT_TRACING=1 (or enable() is called). When
+off, span() returns a shared no-op object and traced functions only pay
+one flag check.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+TRACE_BUFFER_SIZE = int(os.getenv("NEOCONSULT_TRACE_BUFFER", "500"))  # recent traces kept
+TRACE_FILE = os.getenv("NEOCONSULT_TRACE_FILE", "")  # JSON-lines export, one trace per line
+METRICS_PORT = int(os.getenv("NEOCONSULT_METRICS_PORT", "0"))  # Prometheus endpoint, 0 = off
+RECENT_SAMPLES = 1000  # durations kept per stage for percentiles
+
+# Histogram bucket upper bounds in milliseconds (plus +Inf)
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_enabled = os.getenv("NEOCONSULT_TRACING", "0").lower() not in ("", "0", "false", "no")
+_current: contextvars.ContextVar = contextvars.ContextVar("neoconsult_span", default=None)
+_lock = threading.Lock()
+_traces: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+_stages: Dict[str, dict] = {}
+_server = None
+
+
+class Span:
+    """One timed operation; nested spans share the trace of their parent."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration_ms", "attrs", "error", "_spans", "_token", "_t0")
+
+    def __init__(self, name: str, parent: Optional["Span"], attrs: dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.error = None
+        self.duration_ms = None
+        self._spans = parent._spans if parent else []
+
+    def set(self, **attrs):
+        """Attach attributes (sizes, modes, cache hits) to the span."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self._finish((time.perf_counter() - self._t0) * 1000.0, exc_type.__name__ if exc_type else None)
+        return False
+
+    def _finish(self, duration_ms: float, error: Optional[str]):
+        self.duration_ms = duration_ms
+        self.error = error
+        self._spans.append(self)
+        _observe(self.name, duration_ms)
+        if self.parent_id is None:
+            _finish_trace(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True):
+    """Turn tracing on or off for this process."""
+    global _enabled
+    _enabled = on
+
+
+def span(name: str, **attrs):
+    """Context manager timing `name`; a no-op when tracing is off."""
+    if not _enabled:
+        return _NOOP
+    return Span(name, _current.get(), attrs)
+
+
+def traced(name: str):
+    """Decorator running every call of the function inside span(name)."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name, _current.get(), {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record(name: str, duration_ms: float, error: Optional[str] = None, **attrs):
+    """
+    Record an already measured span under the current one, without making
+    it current. For work that cannot sit in a with-block, such as a
+    generator consumed after its caller returned.
+    """
+    if not _enabled:
+        return
+    s = Span(name, _current.get(), attrs)
+    s.start = time.time() - duration_ms / 1000.0
+    s._finish(duration_ms, error)
+
+
+def _observe(name: str, duration_ms: float):
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = {
+                "buckets": [0] * (len(BUCKETS_MS) + 1),
+                "count": 0,
+                "sum_ms": 0.0,
+                "recent": deque(maxlen=RECENT_SAMPLES),
+            }
+        i = 0
+        while i < len(BUCKETS_MS) and duration_ms > BUCKETS_MS[i]:
+            i += 1
+        stage["buckets"][i] += 1
+        stage["count"] += 1
+        stage["sum_ms"] += duration_ms
+        stage["recent"].append(duration_ms)
+
+
+def _finish_trace(root: Span):
+    trace = {
+        "trace_id": root.trace_id,
+        "name": root.name,
+        "start": root.start,
+        "duration_ms": round(root.duration_ms, 3),
+        "error": root.error,
+        "spans": [s.to_dict() for s in sorted(root._spans, key=lambda s: s.start)],
+    }
+    with _lock:
+        _traces.append(trace)
+        if TRACE_FILE:
+            try:
+                with open(TRACE_FILE, "a") as fh:
+                    fh.write(json.dumps(trace, default=str) + "\n")
+            except OSError:
+                pass
+
+
+def recent_traces(n: int = 50) -> List[dict]:
+    """The last `n` finished traces, newest first."""
+    with _lock:
+        return list(_traces)[-n:][::-1]
+
+
+def stage_stats() -> Dict[str, dict]:
+    """{stage: count, mean and p50/p95/p99 of recent durations in ms}."""
+    with _lock:
+        snapshot = {name: (s["count"], s["sum_ms"], sorted(s["recent"])) for name, s in _stages.items()}
+    stats = {}
+    for name, (count, total, recent) in snapshot.items():
+        def pct(q):
+            return recent[min(len(recent) - 1, int(q * len(recent)))] if recent else 0.0
+        stats[name] = {
+            "count": count,
+            "mean_ms": total / count if count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+        }
+    return stats
+
+
+def histogram(name: str) -> List[tuple]:
+    """[(bucket label, count)] for one stage, non-cumulative, in bucket order."""
+    with _lock:
+        stage = _stages.get(name)
+        counts = list(stage["buckets"]) if stage else [0] * (len(BUCKETS_MS) + 1)
+    labels = [f"≤{b:g} ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]:g} ms"]
+    return list(zip(labels, counts))
+
+
+def prometheus_text() -> str:
+    """All stage histograms in the Prometheus text exposition format."""
+    metric = "neoconsult_stage_duration_seconds"
+    lines = [
+        f"# HELP {metric} Duration of traced stages.",
+        f"# TYPE {metric} histogram",
+    ]
+    with _lock:
+        stages = {name: (list(s["buckets"]), s["count"], s["sum_ms"]) for name, s in _stages.items()}
+    for name, (buckets, count, total) in sorted(stages.items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS_MS, buckets):
+            cumulative += n
+            lines.append(f'{metric}_bucket{{stage="{name}",le="{bound / 1000:g}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {count}')
+        lines.append(f'{metric}_sum{{stage="{name}"}} {total / 1000:.6f}')
+        lines.append(f'{metric}_count{{stage="{name}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port: int = METRICS_PORT, host: str = "127.0.0.1"):
+    """
+    Serve /metrics on a background thread (once per process). Does nothing
+    when port is 0 or already bound. Returns the server or None.
+    """
+    global _server
+    if not port:
+        return None
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                return None  # port taken, e.g. by another app process
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
+
+
+def reset():
+    """Drop recorded traces and histograms."""
+    with _lock:
+        _traces.clear()
+        _stages.clear()
@@ -1,16 +1,90 @@
-from email_validator import validate_email, EmailNotValidError
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+from email_validator import validate_email, EmailNotValidError, EmailUndeliverableError
 from datetime import datetime
+from utils.lazy import lazy_import
+from utils.ttl_cache import TTLCache
 
+# dnspython (an email-validator dependency) is slow to import; only the
+# deliverability check needs it
+dns_resolver = lazy_import("dns.resolver")
 
+# How long a domain's DNS deliverability result is reused
+DELIVERABILITY_TTL_SECONDS = 6 * 3600
+DNS_TIMEOUT_SECONDS = 3
+DELIVERABILITY_CACHE_SIZE = 10000  # domains remembered, least recently used dropped first
+
+_domain_cache = TTLCache(DELIVERABILITY_CACHE_SIZE, DELIVERABILITY_TTL_SECONDS)
+
+
+@lru_cache(maxsize=4096)
 def is_valid_email(email: str) -> bool:
-    """Return True if email format is valid."""
+    """
+    Return True if email format is valid.
+    Syntax only: never touches the network, so it is safe on the chat path.
+    """
     try:
-        validate_email(email)
+        validate_email(email, check_deliverability=False)
         return True
     except EmailNotValidError:
         return False
 
 
+def _domain_deliverable(email: str, domain: str) -> Optional[bool]:
+    cached = _domain_cache.get(domain)
+    if cached is not None:
+        return cached
+    try:
+        info = validate_email(email, check_deliverability=True, timeout=DNS_TIMEOUT_SECONDS)
+    except EmailUndeliverableError as e:
+        # Null MX / SPF reject-all (raised without a cause), NXDOMAIN or no
+        # MX/A/AAAA records are answers about the domain. email_validator
+        # also wraps any unexpected resolver error in this exception; that
+        # says nothing about the domain, so it is not cached.
+        if e.__cause__ is not None and not isinstance(e.__cause__, (dns_resolver.NXDOMAIN, dns_resolver.NoAnswer)):
+            return None
+        _domain_cache.put(domain, False)
+        return False
+    except EmailNotValidError:
+        return False  # syntax problem, not a property of the domain
+    if getattr(info, "mx", None) is None and not info.domain.startswith("["):
+        return None  # DNS timeout or no nameservers answered
+    _domain_cache.put(domain, True)
+    return True
+
+
+def is_deliverable_email(email: str) -> Optional[bool]:
+    """
+    Syntax check plus a DNS lookup of the domain (MX / A records).
+    Returns None when DNS could not answer (timeout, resolver error), so
+    callers can retry later. Definitive results are cached per domain for
+    DELIVERABILITY_TTL_SECONDS. This can block on DNS: use it off the chat
+    path (e.g. in the outbox sender).
+    """
+    if not is_valid_email(email):
+        return False
+    return _domain_deliverable(email, email.rsplit("@", 1)[-1].lower())
+
+
+def validate_emails(emails: Iterable[str], check_deliverability: bool = False) -> Dict[str, Optional[bool]]:
+    """
+    Validate many addresses, e.g. for a bulk import. Duplicates are
+    checked once and, with check_deliverability, DNS is queried once
+    per distinct domain (None where DNS could not answer).
+    """
+    results = {e: is_valid_email(e) for e in dict.fromkeys(emails)}
+    if check_deliverability:
+        by_domain: Dict[str, Optional[bool]] = {}
+        for email, ok in results.items():
+            if not ok:
+                continue
+            domain = email.rsplit("@", 1)[-1].lower()
+            if domain not in by_domain:
+                by_domain[domain] = _domain_deliverable(email, domain)
+            results[email] = by_domain[domain]
+    return results
+
+
 def parse_booking_date(date_str: str):
     """Parse date in strict YYYY-MM-DD format. Return date or None."""
     try: